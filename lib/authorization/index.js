@@ -7,6 +7,8 @@ const constants_1 = require("../constants");
 const aws_cognito_1 = require("aws-cdk-lib/aws-cognito");
 const cognito = require("aws-cdk-lib/aws-cognito");
 const lambda = require("aws-cdk-lib/aws-lambda");
+const iam = require("aws-cdk-lib/aws-iam");
+const aws_dynamodb_1 = require("aws-cdk-lib/aws-dynamodb");
 const path = require("path");
 class AuthorizationStack extends constructs_1.Construct {
     constructor(scope, id, props) {
@@ -61,16 +63,34 @@ class AuthorizationStack extends constructs_1.Construct {
             // supportedIdentityProviders: [UserPoolClientIdentityProvider.custom(azureProvider.providerName)],
         });
         this.userPoolClient = userPoolClient;
+        // Connect counts per user and time window, shared by every authorizer container (see rate_limiter.py).
+        // On demand, since connects come in bursts; expired windows are removed by the TTL.
+        const rateLimitTable = new aws_dynamodb_1.Table(this, 'ConnectRateLimitTable', {
+            partitionKey: { name: 'bucket_id', type: aws_dynamodb_1.AttributeType.STRING },
+            timeToLiveAttribute: 'expires_at',
+            billingMode: aws_dynamodb_1.BillingMode.PAY_PER_REQUEST,
+            removalPolicy: cdk.RemovalPolicy.DESTROY,
+        });
         const authorizerHandlerFunction = new lambda.Function(this, 'AuthorizationFunction', {
             runtime: lambda.Runtime.PYTHON_3_12, // Choose any supported Node.js runtime
             code: lambda.Code.fromAsset(path.join(__dirname, 'websocket-api-authorizer')), // Points to the lambda directory
             handler: 'lambda_function.lambda_handler', // Points to the 'hello' file in the lambda directory
             environment: {
                 "USER_POOL_ID": userPool.userPoolId,
-                "APP_CLIENT_ID": userPoolClient.userPoolClientId
+                "APP_CLIENT_ID": userPoolClient.userPoolClientId,
+                // allow every route of the stage so one decision per token can be reused across routes
+                "POLICY_RESOURCE_SCOPE": "stage",
+                "RATE_LIMIT_TABLE": rateLimitTable.tableName
             },
             timeout: cdk.Duration.seconds(30)
         });
+        authorizerHandlerFunction.addToRolePolicy(new iam.PolicyStatement({
+            effect: iam.Effect.ALLOW,
+            actions: [
+                'dynamodb:UpdateItem'
+            ],
+            resources: [rateLimitTable.tableArn]
+        }));
         this.lambdaAuthorizer = authorizerHandlerFunction;
         new cdk.CfnOutput(this, "UserPool ID", {
             value: userPool.userPoolId || "",
@@ -4,6 +4,8 @@ import { cognitoDomainName } from '../constants'
 import { UserPool, UserPoolIdentityProviderOidc,UserPoolClient, UserPoolClientIdentityProvider, ProviderAttribute } from 'aws-cdk-lib/aws-cognito';
 import * as cognito from "aws-cdk-lib/aws-cognito";
 import * as lambda from 'aws-cdk-lib/aws-lambda';
+import * as iam from 'aws-cdk-lib/aws-iam';
+import { Table, AttributeType, BillingMode } from 'aws-cdk-lib/aws-dynamodb';
 import * as path from 'path';
 
 export class AuthorizationStack extends Construct {
@@ -71,17 +73,37 @@ export class AuthorizationStack extends Construct {
 
     this.userPoolClient = userPoolClient;
 
+    // Connect counts per user and time window, shared by every authorizer container (see rate_limiter.py).
+    // On demand, since connects come in bursts; expired windows are removed by the TTL.
+    const rateLimitTable = new Table(this, 'ConnectRateLimitTable', {
+      partitionKey: { name: 'bucket_id', type: AttributeType.STRING },
+      timeToLiveAttribute: 'expires_at',
+      billingMode: BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+
     const authorizerHandlerFunction = new lambda.Function(this, 'AuthorizationFunction', {
       runtime: lambda.Runtime.PYTHON_3_12, // Choose any supported Node.js runtime
       code: lambda.Code.fromAsset(path.join(__dirname, 'websocket-api-authorizer')), // Points to the lambda directory
       handler: 'lambda_function.lambda_handler', // Points to the 'hello' file in the lambda directory
       environment: {
         "USER_POOL_ID" : userPool.userPoolId,
-        "APP_CLIENT_ID" : userPoolClient.userPoolClientId
+        "APP_CLIENT_ID" : userPoolClient.userPoolClientId,
+        // allow every route of the stage so one decision per token can be reused across routes
+        "POLICY_RESOURCE_SCOPE" : "stage",
+        "RATE_LIMIT_TABLE" : rateLimitTable.tableName
       },
       timeout: cdk.Duration.seconds(30)
     });
 
+    authorizerHandlerFunction.addToRolePolicy(new iam.PolicyStatement({
+      effect: iam.Effect.ALLOW,
+      actions: [
+        'dynamodb:UpdateItem'
+      ],
+      resources: [rateLimitTable.tableArn]
+    }));
+
     this.lambdaAuthorizer = authorizerHandlerFunction;
     
     new cdk.CfnOutput(this, "UserPool ID", {
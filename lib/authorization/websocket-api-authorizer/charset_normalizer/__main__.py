@@ -1,4 +0,0 @@
-from .cli import cli_detect
-
-if __name__ == "__main__":
-    cli_detect()
@@ -1,2 +0,0 @@
-__version__ = '3.7'
-
@@ -1,37 +1,242 @@
+# Only the standard library, rs256 and the rsa package it verifies with are imported at load time to keep
+# cold starts short. jose (and the ecdsa/pyasn1 stack behind it) is imported lazily for non-RS256 keys.
 import json
-from jose import jwt, jwk
-from jose.utils import base64url_decode
-import requests
+import http.client
+from collections import OrderedDict
+import hashlib
+import threading
 import time
 import os
+from urllib.parse import urlsplit
+from rs256 import RS256PublicKey, base64url_decode
+from rate_limiter import allow_connect
 
-def lambda_handler(event, context):
-    token = event['queryStringParameters']['Authorization']
-    print(token)
+# How long a downloaded JWKS stays valid for the life of a warm container
+JWKS_CACHE_TTL_SECONDS = int(os.environ.get('JWKS_CACHE_TTL_SECONDS', '3600'))
+# Minimum gap between refreshes triggered by an unknown kid, so a burst of bad tokens cannot hammer Cognito
+JWKS_MIN_REFRESH_SECONDS = int(os.environ.get('JWKS_MIN_REFRESH_SECONDS', '30'))
+# After a failed refresh the cached keys keep being served and no fetch is tried again for this long
+JWKS_RETRY_SECONDS = int(os.environ.get('JWKS_RETRY_SECONDS', '10'))
+
+# Keep-alive HTTPS connection to Cognito reused across invocations of a warm container
+jwks_connection = None
+
+# Process-wide JWKS cache: constructed public keys by kid, the time they were fetched and the time before
+# which no refresh is tried after a failed one
+jwks_cache = {'keys': {}, 'fetched_at': 0.0, 'retry_at': 0.0}
+# Only one thread refreshes the JWKS at a time, the rest wait and reuse its result
+jwks_refresh_lock = threading.Lock()
+
+# 'route' scopes the Allow policy to the exact methodArn, 'stage' to every route of the API stage so
+# one authorization decision per token can be reused for any route
+POLICY_RESOURCE_SCOPE = os.environ.get('POLICY_RESOURCE_SCOPE', 'route')
+
+# Upper bound on the number of verified tokens remembered by a warm container
+TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get('TOKEN_CACHE_MAX_ENTRIES', '1024'))
+
+# LRU of already-verified tokens keyed by the SHA-256 of the token, each entry lives until the token's exp
+token_cache = OrderedDict()
+token_cache_lock = threading.Lock()
+token_cache_stats = {'hits': 0, 'misses': 0}
+# Token cache stats are logged on the first call of a container and then once every this many calls
+TOKEN_CACHE_STATS_EVERY = int(os.environ.get('TOKEN_CACHE_STATS_EVERY', '1000'))
+
+
+def get_keys_url():
+    # JWKS_URL points the authorizer at another JWKS endpoint, e.g. a local stand-in for benchmarks
+    if os.environ.get('JWKS_URL'):
+        return os.environ['JWKS_URL']
     user_pool_id = os.environ.get('USER_POOL_ID')
     region = 'us-east-1'
+    return f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json'
+
+
+# Parse a JWK once into an object with a verify(message, signature) method
+def construct_public_key(key):
+    if key.get('kty') == 'RSA' and key.get('alg', 'RS256') == 'RS256':
+        return RS256PublicKey.from_jwk(key)
+    from jose import jwk
+    return jwk.construct(key)
+
+
+# GET a JSON document over the kept-alive connection, reconnecting once if the server dropped it
+def http_get_json(url):
+    global jwks_connection
+    parts = urlsplit(url)
+    for attempt in range(2):
+        if jwks_connection is None or (jwks_connection.host, jwks_connection.port) != (parts.hostname, parts.port or jwks_connection.default_port):
+            connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+            jwks_connection = connection_class(parts.hostname, parts.port, timeout=5)
+        try:
+            jwks_connection.request('GET', parts.path, headers={'Accept': 'application/json'})
+            response = jwks_connection.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError):
+            jwks_connection.close()
+            jwks_connection = None
+            if attempt:
+                raise
+            continue
+        if response.status != 200:
+            raise Exception(f'GET {url} returned HTTP {response.status}')
+        return json.loads(body)
+
+
+# Download the JWKs and transform them into ready-to-verify public keys keyed by kid
+def fetch_jwks():
+    keys = http_get_json(get_keys_url())['keys']
+    return {key['kid']: construct_public_key(key) for key in keys}
+
+
+# Refresh the cache unless another caller already did so after `seen_fetched_at`. A failed refresh keeps
+# the cached keys and holds off further attempts for JWKS_RETRY_SECONDS, so requests are not all stuck
+# on fetch timeouts while Cognito is unreachable.
+def refresh_jwks(seen_fetched_at, force=False):
+    with jwks_refresh_lock:
+        if jwks_cache['fetched_at'] != seen_fetched_at:
+            # someone else refreshed while we were waiting on the lock
+            return
+        if not force and time.time() - jwks_cache['fetched_at'] < JWKS_MIN_REFRESH_SECONDS:
+            # the kid miss happened too soon after the last fetch, don't refetch
+            return
+        if time.time() < jwks_cache['retry_at']:
+            # a refresh failed moments ago
+            return
+        try:
+            keys = fetch_jwks()
+        except Exception as e:
+            jwks_cache['retry_at'] = time.time() + JWKS_RETRY_SECONDS
+            print(f"Could not refresh JWKS, serving {len(jwks_cache['keys'])} cached keys: {str(e)}")
+            return
+        jwks_cache['keys'] = keys
+        jwks_cache['fetched_at'] = time.time()
+        print(f"Refreshed JWKS, {len(jwks_cache['keys'])} keys cached")
+
+
+# Return the public key for a kid, fetching the JWKS on a cold cache, on expiry or on a kid miss.
+# None when the kid is unknown, also when the JWKS could not be fetched.
+def get_public_key(kid):
+    fetched_at = jwks_cache['fetched_at']
+    if time.time() - fetched_at > JWKS_CACHE_TTL_SECONDS:
+        refresh_jwks(fetched_at, force=True)
+    elif kid not in jwks_cache['keys']:
+        refresh_jwks(fetched_at)
+    return jwks_cache['keys'].get(kid)
+
+
+# Decode one dot-separated segment of a JWT into a dict without verifying anything
+def decode_segment(segment):
+    return json.loads(base64url_decode(segment))
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+# Return the cached verification result for a token, or None if it is unknown or expired
+def get_cached_token(digest):
+    with token_cache_lock:
+        entry = token_cache.get(digest)
+        if entry is None:
+            token_cache_stats['misses'] += 1
+            return None
+        if time.time() > entry['exp']:
+            # the token expired since it was verified, make the caller go through full validation
+            del token_cache[digest]
+            token_cache_stats['misses'] += 1
+            return None
+        token_cache.move_to_end(digest)
+        token_cache_stats['hits'] += 1
+        return entry
+
+
+def put_cached_token(digest, claims, policy_document):
+    with token_cache_lock:
+        token_cache[digest] = {'exp': claims['exp'], 'policy': policy_document}
+        token_cache.move_to_end(digest)
+        while len(token_cache) > TOKEN_CACHE_MAX_ENTRIES:
+            token_cache.popitem(last=False)
+
+
+def get_token_cache_stats():
+    with token_cache_lock:
+        return {**token_cache_stats, 'size': len(token_cache)}
+
+
+# Turn arn:aws:execute-api:{region}:{account}:{api_id}/{stage}/{route} into the resource the policy allows
+def policy_resource(method_arn):
+    if POLICY_RESOURCE_SCOPE == 'stage':
+        api_arn, stage = method_arn.split('/')[:2]
+        return f'{api_arn}/{stage}/*'
+    return method_arn
+
+
+def build_policy_document(principal_id, role, resource, effect='Allow'):
+    return {
+        'principalId': principal_id,
+        'context' : {"role" : role},
+        'policyDocument': {
+            'Version': '2012-10-17',
+            'Statement': [{
+                'Action': 'execute-api:Invoke',
+                'Effect': effect,
+                'Resource': resource
+            }]
+        }
+    }
+
+
+# Explicit Deny for a token that could not be verified
+def deny_policy(method_arn):
+    return build_policy_document('unauthorized', '', method_arn, effect='Deny')
+
+
+# Swap an Allow policy for a Deny once the user is over their connect rate, before any model work starts
+def apply_rate_limit(policy_document):
+    if allow_connect(policy_document['principalId'], policy_document['context']['role']):
+        return policy_document
+    print(f"Connect rate limit exceeded for {policy_document['principalId']}")
+    statement = policy_document['policyDocument']['Statement'][0]
+    return build_policy_document(policy_document['principalId'], policy_document['context']['role'], statement['Resource'], effect='Deny')
+
+
+def lambda_handler(event, context):
+    token = event['queryStringParameters']['Authorization']
     app_client_id = os.environ.get('APP_CLIENT_ID')
-    keys_url = f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json'
-    
-    # Download JWKs and transform them to a key dictionary
-    response = requests.get(keys_url)
-    keys = response.json()['keys']
-    key_dict = {key['kid']: json.dumps(key) for key in keys}
+
+    # Repeat connects with an already-verified token skip signature verification entirely
+    digest = token_digest(token)
+    cached = get_cached_token(digest)
+    stats = get_token_cache_stats()
+    calls = stats['hits'] + stats['misses']
+    if calls == 1 or calls % TOKEN_CACHE_STATS_EVERY == 0:
+        print(f'Token cache stats: {stats}')
+    if cached is not None:
+        policy_document = cached['policy']
+        resource = policy_resource(event['methodArn'])
+        if policy_document['policyDocument']['Statement'][0]['Resource'] != resource:
+            policy_document = build_policy_document(policy_document['principalId'], policy_document['context']['role'], resource)
+        return apply_rate_limit(policy_document)
 
     # Decode and validate the token
-    headers = jwt.get_unverified_headers(token)
-    print(key_dict)
-    print(headers)
-    key = json.loads(key_dict[headers['kid']])
-    public_key = jwk.construct(key)
-    print(public_key)
+    try:
+        headers = decode_segment(token.split('.', 1)[0])
+    except ValueError:
+        headers = None
+    if not isinstance(headers, dict):
+        print('Token is not a well-formed JWT')
+        return deny_policy(event['methodArn'])
+    public_key = get_public_key(headers.get('kid'))
+    if public_key is None:
+        print('Public key not found in jwks.json')
+        return deny_policy(event['methodArn'])
 
     # Validate the token
     try:
         message, encoded_signature = str(token).rsplit('.', 1)
-        
+
         # decode the signature
-        decoded_signature = base64url_decode(encoded_signature.encode('utf-8'))
+        decoded_signature = base64url_decode(encoded_signature)
 
         # verify the signature
         if not public_key.verify(message.encode("utf8"), decoded_signature):
@@ -39,34 +244,25 @@ def lambda_handler(event, context):
             raise Exception("Failed")
         print('Signature successfully verified')
 
-        claims = jwt.get_unverified_claims(token)
-        
+        claims = decode_segment(message.split('.')[1])
+
         # additionally we can verify the token expiration
         if time.time() > claims['exp']:
             print('Token is expired')
             raise Exception("Expired")
-        
+
         # and the Audience  (use claims['client_id'] if verifying an access token)
         if claims['aud'] != app_client_id:
             print('Token was not issued for this audience')
             raise Exception("Wrong audience")
-                
+
         principalId = claims['sub']
         role = claims.get('custom:role','')
 
         # Generate policy document
-        policy_document = {
-            'principalId': principalId,
-            'context' : {"role" : role},
-            'policyDocument': {
-                'Version': '2012-10-17',
-                'Statement': [{
-                    'Action': 'execute-api:Invoke',
-                    'Effect': 'Allow',
-                    'Resource': event['methodArn']
-                }]
-            }
-        }        
-        return policy_document
+        policy_document = build_policy_document(principalId, role, policy_resource(event['methodArn']))
+        put_cached_token(digest, claims, policy_document)
+        return apply_rate_limit(policy_document)
     except Exception as e:
-        print(f'Token validation error: {str(e)}')
\ No newline at end of file
+        print(f'Token validation error: {str(e)}')
+        return deny_policy(event['methodArn'])
@@ -0,0 +1,94 @@
+# Per-user connection rate limiting for the WebSocket authorizer.
+#
+# Every user (keyed on the token's `sub`) gets a token bucket sized by their `custom:role`:
+# `burst` connects straight away, refilled at `per_minute`. The in-memory bucket of a warm
+# container is checked first so an over-limit connect is denied without any network call.
+# When RATE_LIMIT_TABLE is set, connects that pass locally are also counted in a DynamoDB table
+# shared by all containers (partition key `bucket_id` (S), TTL attribute `expires_at`), using an
+# atomic conditional ADD per user and window of burst / per_minute minutes. The authorization stack
+# creates that table (ConnectRateLimitTable) and passes its name to the authorizer in RATE_LIMIT_TABLE.
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Limits per role, `default` applies to users without a configured role. A per_minute of 0 disables limiting.
+DEFAULT_CONNECT_RATE_LIMITS = {
+    'default': {'burst': 20, 'per_minute': 10},
+    'Admin': {'burst': 200, 'per_minute': 120},
+}
+CONNECT_RATE_LIMITS = json.loads(os.environ['CONNECT_RATE_LIMITS']) if os.environ.get('CONNECT_RATE_LIMITS') else DEFAULT_CONNECT_RATE_LIMITS
+RATE_LIMIT_TABLE = os.environ.get('RATE_LIMIT_TABLE')
+# Number of users whose local bucket a warm container remembers
+RATE_LIMIT_MAX_USERS = int(os.environ.get('RATE_LIMIT_MAX_USERS', '10000'))
+
+local_buckets = OrderedDict()
+local_buckets_lock = threading.Lock()
+shared_table = None
+
+
+# custom:role holds a JSON list of roles (e.g. '["Admin"]'), a user gets the most generous limit among them
+def limits_for_role(role_claim):
+    try:
+        roles = json.loads(role_claim) if role_claim else []
+    except ValueError:
+        roles = [role_claim]
+    if isinstance(roles, str):
+        roles = [roles]
+    candidates = [CONNECT_RATE_LIMITS[role] for role in roles if role in CONNECT_RATE_LIMITS]
+    if not candidates:
+        return CONNECT_RATE_LIMITS['default']
+    if any(limits['per_minute'] == 0 for limits in candidates):
+        return {'burst': 0, 'per_minute': 0}
+    return max(candidates, key=lambda limits: (limits['per_minute'], limits['burst']))
+
+
+# Take one token from the user's bucket in this container, False if it is empty
+def take_local(user_id, limits, now):
+    with local_buckets_lock:
+        tokens, updated_at = local_buckets.pop(user_id, (limits['burst'], now))
+        tokens = min(limits['burst'], tokens + (now - updated_at) * limits['per_minute'] / 60)
+        allowed = tokens >= 1
+        local_buckets[user_id] = (tokens - 1 if allowed else tokens, now)
+        while len(local_buckets) > RATE_LIMIT_MAX_USERS:
+            local_buckets.popitem(last=False)
+        return allowed
+
+
+# Count the connect in the shared table, False once the user's window is full
+def take_shared(user_id, limits, now):
+    global shared_table
+    # boto3 is only loaded when a shared table is configured, keeping the default cold start slim
+    import boto3
+    from botocore.exceptions import ClientError
+    if shared_table is None:
+        shared_table = boto3.resource('dynamodb', region_name='us-east-1').Table(RATE_LIMIT_TABLE)
+    window = max(1, int(limits['burst'] / limits['per_minute'] * 60))
+    window_start = int(now) // window * window
+    try:
+        shared_table.update_item(
+            Key={'bucket_id': f'{user_id}#{window_start}'},
+            UpdateExpression='ADD hits :one SET expires_at = if_not_exists(expires_at, :expires_at)',
+            ConditionExpression='attribute_not_exists(hits) OR hits < :burst',
+            ExpressionAttributeValues={':one': 1, ':burst': limits['burst'], ':expires_at': window_start + 2 * window},
+        )
+        return True
+    except ClientError as error:
+        if error.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        # never lock users out because the limiter itself is unavailable
+        print(f'Caught error: rate limit table error - allowing connect: {error}')
+        return True
+
+
+def allow_connect(user_id, role_claim):
+    limits = limits_for_role(role_claim)
+    if limits['per_minute'] == 0:
+        return True
+    now = time.time()
+    if not take_local(user_id, limits, now):
+        return False
+    if RATE_LIMIT_TABLE:
+        return take_shared(user_id, limits, now)
+    return True
@@ -0,0 +1,33 @@
+import base64
+
+import rsa
+
+
+def base64url_decode(value):
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return base64.urlsafe_b64decode(value + b'=' * (-len(value) % 4))
+
+
+def b64_to_int(value):
+    return int.from_bytes(base64url_decode(value), 'big')
+
+
+# An RSA public key parsed once from a JWK and ready to check RS256 signatures. Verification is done by the
+# vendored rsa package, the backend jose uses here too, without the cost of importing jose at cold start.
+class RS256PublicKey:
+    def __init__(self, n, e):
+        self.key = rsa.PublicKey(n, e)
+
+    @classmethod
+    def from_jwk(cls, key):
+        if key.get('kty') != 'RSA':
+            raise ValueError(f"Unsupported key type: {key.get('kty')}")
+        return cls(b64_to_int(key['n']), b64_to_int(key['e']))
+
+    # rsa.verify accepts any hash it recognizes in the signature, RS256 only allows SHA-256
+    def verify(self, message, signature):
+        try:
+            return rsa.verify(message, signature, self.key) == 'SHA-256'
+        except rsa.VerificationError:
+            return False
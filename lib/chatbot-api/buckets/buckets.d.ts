@@ -5,5 +5,6 @@ export declare class S3BucketStack extends cdk.Stack {
     readonly knowledgeBucket: s3.Bucket;
     readonly feedbackBucket: s3.Bucket;
     readonly evalTestCasesBucket: s3.Bucket;
+    readonly sessionArchiveBucket: s3.Bucket;
     constructor(scope: Construct, id: string, props?: cdk.StackProps);
 }
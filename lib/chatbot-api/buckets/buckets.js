@@ -22,6 +22,12 @@ class S3BucketStack extends cdk.Stack {
             versioned: true,
             removalPolicy: cdk.RemovalPolicy.DESTROY,
             autoDeleteObjects: true,
+            // export job requests, statuses and CSVs are only needed for a while after the job
+            lifecycleRules: [{
+                    prefix: 'export-jobs/',
+                    expiration: cdk.Duration.days(7),
+                    noncurrentVersionExpiration: cdk.Duration.days(1)
+                }],
             cors: [{
                     allowedMethods: [s3.HttpMethods.GET, s3.HttpMethods.POST, s3.HttpMethods.PUT, s3.HttpMethods.DELETE],
                     allowedOrigins: ['*'],
@@ -38,6 +44,17 @@ class S3BucketStack extends cdk.Stack {
                     allowedHeaders: ["*"]
                 }]
         });
+        // Idle chat sessions moved out of the session table, only read back by the session handler
+        this.sessionArchiveBucket = new s3.Bucket(scope, 'SessionArchiveBucket', {
+            removalPolicy: cdk.RemovalPolicy.DESTROY,
+            autoDeleteObjects: true,
+            lifecycleRules: [{
+                    transitions: [{
+                            storageClass: s3.StorageClass.INFREQUENT_ACCESS,
+                            transitionAfter: cdk.Duration.days(30)
+                        }]
+                }]
+        });
     }
 }
 exports.S3BucketStack = S3BucketStack;
@@ -6,6 +6,7 @@ export class S3BucketStack extends cdk.Stack {
   public readonly knowledgeBucket: s3.Bucket;
   public readonly feedbackBucket: s3.Bucket;
   public readonly evalTestCasesBucket: s3.Bucket;
+  public readonly sessionArchiveBucket: s3.Bucket;
 
   constructor(scope: Construct, id: string, props?: cdk.StackProps) {
     super(scope, id, props);
@@ -27,6 +28,12 @@ export class S3BucketStack extends cdk.Stack {
       versioned: true,
       removalPolicy: cdk.RemovalPolicy.DESTROY,
       autoDeleteObjects: true,
+      // export job requests, statuses and CSVs are only needed for a while after the job
+      lifecycleRules: [{
+        prefix: 'export-jobs/',
+        expiration: cdk.Duration.days(7),
+        noncurrentVersionExpiration: cdk.Duration.days(1)
+      }],
       cors: [{
         allowedMethods: [s3.HttpMethods.GET,s3.HttpMethods.POST,s3.HttpMethods.PUT,s3.HttpMethods.DELETE],
         allowedOrigins: ['*'], 
@@ -44,5 +51,17 @@ export class S3BucketStack extends cdk.Stack {
         allowedHeaders: ["*"]     
       }]
     });
+
+    // Idle chat sessions moved out of the session table, only read back by the session handler
+    this.sessionArchiveBucket = new s3.Bucket(scope, 'SessionArchiveBucket', {
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      autoDeleteObjects: true,
+      lifecycleRules: [{
+        transitions: [{
+          storageClass: s3.StorageClass.INFREQUENT_ACCESS,
+          transitionAfter: cdk.Duration.days(30)
+        }]
+      }]
+    });
   }
 }
@@ -1,16 +1,79 @@
+import csv
+import hashlib
+import heapq
+import io
 import json
+import random
+import tempfile
+import time
 import uuid
 import boto3
 import os
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from urllib.parse import unquote_plus
 from boto3.dynamodb.conditions import Key, Attr
 
 # Initialize DynamoDB client
 dynamodb = boto3.resource('dynamodb')
 table = dynamodb.Table(os.environ.get('FEEDBACK_TABLE'))
+stats_table = dynamodb.Table(os.environ.get('FEEDBACK_STATS_TABLE'))
 
 from decimal import Decimal
 
+# AnyIndex is partitioned on `Any`, which is spread over ANY_SHARDS values (YES#0 ... YES#<ANY_SHARDS - 1>) so
+# feedback writes and any-topic reads are not all served by one partition. Reads query every shard and merge
+# the results by CreatedAt. Feedback written before sharding is in the LEGACY_ANY partition, read as one more
+# shard. Changing ANY_SHARDS only changes where new feedback goes; readers must keep querying old shards.
+ANY_SHARDS = 8
+LEGACY_ANY = 'YES'
+# Feedback items per page in get_feedback, unless the request asks for another size up to MAX_FEEDBACK_PAGE_SIZE
+FEEDBACK_PAGE_SIZE = 10
+MAX_FEEDBACK_PAGE_SIZE = 100
+# Attributes get_feedback returns in list mode (view=list), enough for the admin table. The long ones
+# (UserPrompt, ChatbotMessage, FeedbackComments, Sources) are fetched for one item at a time by
+# get_feedback_item; the list shows the first PROMPT_PREVIEW_LENGTH characters of the prompt instead.
+# AnyListIndex and TopicListIndex project exactly these, so listing feedback reads small index items only.
+LIST_COLUMNS = ['FeedbackID', 'Topic', 'CreatedAt', 'Any', 'Problem', 'Feedback', 'UserPromptPreview', 'SessionID']
+PROMPT_PREVIEW_LENGTH = 200
+
+# Feedback attributes in the CSV export, in column order, and the header row naming them
+EXPORT_COLUMNS = ['FeedbackID', 'SessionID', 'UserPrompt', 'FeedbackComments', 'Topic', 'Problem', 'Feedback', 'ChatbotMessage', 'CreatedAt']
+EXPORT_HEADER = ['FeedbackID', 'SessionID', 'UserPrompt', 'FeedbackComment', 'Topic', 'Problem', 'Feedback', 'ChatbotMessage', 'CreatedAt']
+# S3 multipart parts must be at least 5 MB, except the last one
+EXPORT_PART_SIZE = 8 * 1024 * 1024
+
+# Export jobs keep their request, status and CSV under export-jobs/<job id>/ in the download bucket. Writing
+# the request object starts the job in the export function (export_job_handler).
+EXPORT_JOB_PREFIX = 'export-jobs/'
+# Time slices of a job's CreatedAt range that are queried in parallel
+EXPORT_SLICES = 8
+# A finished export is handed out again for an identical request made within this many seconds
+EXPORT_REUSE_SECONDS = 15 * 60
+# A job that has not finished after this long is assumed lost and started again (export function timeout + margin)
+EXPORT_STALE_SECONDS = 16 * 60
+CREATED_AT_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+# CreatedAt, the sort key of the feedback table, is '<UTC time with milliseconds>Z#<FeedbackID>', e.g.
+# 2024-05-01T12:00:00.123Z#<uuid>, so feedback on the same topic in the same instant gets distinct keys. Keys
+# written before are the bare time to the second (2024-05-01T12:00:00Z); both forms start with the time, sort
+# together in time order and stay readable and deletable, so existing feedback needs no migration.
+
+# Feedback counters in the stats table, sorted by day within a partition:
+#   <YYYY-MM-DD>#total               all feedback of the day
+#   <YYYY-MM-DD>#topic#<topic>       feedback of the day by topic
+#   <YYYY-MM-DD>#problem#<problem>   negative feedback of the day by problem
+# with the counts in Positive and Negative. Every feedback post adds to the day total, so the counters are
+# spread over STATS_SHARDS partitions (feedback#0 ... feedback#<STATS_SHARDS - 1>) picked by FeedbackID, and
+# a counter's value is the sum over the shards. Counters written before sharding are in the STATS_METRIC
+# partition, read as one more shard. A dashboard over a date range is one query per shard however much
+# feedback there is.
+STATS_METRIC = 'feedback'
+STATS_SHARDS = 8
+# Attempts at updating the counters of one feedback item while other posts to the same shard conflict with it
+STATS_UPDATE_ATTEMPTS = 4
+
 class DecimalEncoder(json.JSONEncoder):
   def default(self, obj):
     if isinstance(obj, Decimal):
@@ -43,6 +106,10 @@ def lambda_handler(event, context):
             return download_feedback(event)
         return post_feedback(event)
     elif 'GET' in http_method and admin:
+        if event.get('rawPath') == '/user-feedback/stats':
+            return get_feedback_stats(event)
+        if event.get('rawPath') == '/user-feedback/item':
+            return get_feedback_item(event)
         return get_feedback(event)
     elif 'DELETE' in http_method and admin:
         return delete_feedback(event)
@@ -56,26 +123,35 @@ def post_feedback(event):
     try:
         # Load JSON data from the event body
         feedback_data = json.loads(event['body'])
-        # Generate a unique feedback ID and current timestamp
+        # Generate a unique feedback ID and the sort key from the current time and that ID
         feedback_id = str(uuid.uuid4())
-        timestamp = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+        created_at = feedback_created_at(feedback_id)
         # Prepare the item to store in DynamoDB
         feedback_data = feedback_data['feedbackData']
         item = {
             'FeedbackID': feedback_id,
             'SessionID': feedback_data['sessionId'],
             'UserPrompt': feedback_data['prompt'],
+            'UserPromptPreview': feedback_data['prompt'][:PROMPT_PREVIEW_LENGTH],
             'FeedbackComments': feedback_data.get('comment',''),
             'Topic': feedback_data.get('topic','N/A (Good Response)'),
             'Problem': feedback_data.get("problem",''),
             'Feedback': feedback_data["feedback"],
             'ChatbotMessage': feedback_data['completion'],
             'Sources' : feedback_data['sources'],
-            'CreatedAt': timestamp,
-            'Any' : "YES"
+            'CreatedAt': created_at,
+            'Any' : any_shard(feedback_id),
+            'StatsShard': stats_shard(feedback_id)
         }
-        # Put the item into the DynamoDB table
-        table.put_item(Item=item)
+        # Put the item into the DynamoDB table, the condition makes sure no existing feedback is ever overwritten
+        table.put_item(Item=item, ConditionExpression='attribute_not_exists(CreatedAt)')
+        # The counters are updated on their own: the feedback is stored even if they are not. StatsShard marks
+        # feedback that was counted, so it is dropped again when the counters were not updated (all or none are).
+        if not update_stats(item, 1):
+            try:
+                table.update_item(Key={'Topic': item['Topic'], 'CreatedAt': created_at}, UpdateExpression='REMOVE StatsShard')
+            except Exception as e:
+                print(f"Caught error: DynamoDB error - could not mark feedback as not counted: {e}")
         if feedback_data["feedback"] == 0:
             print("Negative feedback placed")
         return {
@@ -97,31 +173,211 @@ def post_feedback(event):
         }
         
     
+def feedback_created_at(feedback_id):
+    return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z#' + feedback_id
+
+
+# The time part of a CreatedAt key
+def created_at_time(created_at):
+    return created_at.partition('#')[0]
+
+
+# Upper CreatedAt bound of a range ending at end_time, inclusive of end_time whatever its precision: a date
+# takes in that whole day and a time every key within that second ('~' sorts after all key characters)
+def created_at_end(end_time):
+    return end_time + '~'
+
+
+# AnyIndex partition of a feedback item, fixed by its id so writes spread evenly over the shards
+def any_shard(feedback_id):
+    return f'{LEGACY_ANY}#{uuid.UUID(feedback_id).int % ANY_SHARDS}'
+
+
+# Every AnyIndex partition that can hold feedback
+def any_partitions():
+    return [LEGACY_ANY] + [f'{LEGACY_ANY}#{shard}' for shard in range(ANY_SHARDS)]
+
+
+# Stats table partition a feedback item is counted in, fixed by its id so posts spread evenly over the shards
+def stats_shard(feedback_id):
+    return f'{STATS_METRIC}#{uuid.UUID(feedback_id).int % STATS_SHARDS}'
+
+
+# Every stats table partition that can hold counters
+def stats_partitions():
+    return [STATS_METRIC] + [f'{STATS_METRIC}#{shard}' for shard in range(STATS_SHARDS)]
+
+
+# Counter buckets of a feedback item: the day total, its topic and, for negative feedback, its problem
+def stats_buckets(item):
+    day = item['CreatedAt'][:10]
+    buckets = [(f'{day}#total', 'total', None), (f'{day}#topic#{item["Topic"]}', 'topic', item['Topic'])]
+    if item.get('Problem'):
+        buckets.append((f'{day}#problem#{item["Problem"]}', 'problem', item['Problem']))
+    return buckets
+
+
+# Update actions adding a feedback item to its counters (count=1) or taking it out of them (count=-1)
+def stats_updates(item, count):
+    positive = item['Feedback'] == 1
+    updates = []
+    for bucket, dimension, value in stats_buckets(item):
+        assignments = '#day = :day, Dimension = :dimension'
+        names = {'#day': 'Day'}
+        values = {
+            ':day': bucket[:10],
+            ':dimension': dimension,
+            ':positive': count if positive else 0,
+            ':negative': 0 if positive else count
+        }
+        if value is not None:
+            assignments += ', #value = :value'
+            names['#value'] = 'Value'
+            values[':value'] = value
+        updates.append({
+            'TableName': stats_table.name,
+            'Key': {'Metric': item['StatsShard'], 'Bucket': bucket},
+            'UpdateExpression': f'SET {assignments} ADD Positive :positive, Negative :negative',
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values
+        })
+    return updates
+
+
+# Add a feedback item to its counters or take it out of them, best effort. The counters of an item are updated
+# together in one transaction, so they are either all updated or none is. Posts counted in the same shard at
+# the same time can cancel each other's transactions; those are retried after a short random wait, throttled
+# calls are retried by the client. Returns False when the counters were not updated, the error is only logged.
+def update_stats(item, count):
+    for attempt in range(STATS_UPDATE_ATTEMPTS):
+        try:
+            dynamodb.meta.client.transact_write_items(
+                TransactItems=[{'Update': update} for update in stats_updates(item, count)])
+            return True
+        except Exception as e:
+            response = getattr(e, 'response', {})
+            reasons = set(reason.get('Code') for reason in response.get('CancellationReasons', []))
+            conflict = response.get('Error', {}).get('Code') == 'TransactionCanceledException' and reasons <= {'None', 'TransactionConflict'}
+            if not conflict or attempt == STATS_UPDATE_ATTEMPTS - 1:
+                print(f"Caught error: DynamoDB error - could not update feedback counters: {e}")
+                return False
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+
+
+def get_feedback_stats(event):
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        start_time = query_params.get('startTime')
+        end_time = query_params.get('endTime')
+        if not start_time or not end_time:
+            return {
+                'headers': {
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'statusCode': 400,
+                'body': json.dumps('Missing startTime or endTime')
+            }
+
+        # Every bucket of the days from startTime to endTime, both included ('~' sorts after '#'), in every shard
+        def query_partition(partition):
+            query_kwargs = {
+                'KeyConditionExpression': Key('Metric').eq(partition) & Key('Bucket').between(start_time[:10], end_time[:10] + '~')
+            }
+            partition_items = []
+            while True:
+                response = query_table(stats_table, **query_kwargs)
+                partition_items.extend(response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    return partition_items
+                query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        partitions = stats_partitions()
+        with ThreadPoolExecutor(max_workers=len(partitions)) as pool:
+            shard_items = list(pool.map(query_partition, partitions))
+
+        # The shards of a counter added up, one item per bucket in bucket order
+        merged = {}
+        for item in heapq.merge(*shard_items, key=lambda item: item['Bucket']):
+            counter = merged.setdefault(item['Bucket'], {**item, 'Metric': STATS_METRIC, 'Positive': 0, 'Negative': 0})
+            counter['Positive'] += int(item.get('Positive', 0))
+            counter['Negative'] += int(item.get('Negative', 0))
+        items = list(merged.values())
+
+        # Per-day rows as stored, plus the whole range added up per topic and problem
+        days = []
+        totals = {'Positive': 0, 'Negative': 0}
+        topics = {}
+        problems = {}
+        for item in items:
+            counts = {'Positive': int(item.get('Positive', 0)), 'Negative': int(item.get('Negative', 0))}
+            if item['Dimension'] == 'total':
+                days.append({'Day': item['Day'], **counts})
+                group = totals
+            else:
+                group = (topics if item['Dimension'] == 'topic' else problems).setdefault(item['Value'], {'Positive': 0, 'Negative': 0})
+            group['Positive'] += counts['Positive']
+            group['Negative'] += counts['Negative']
+
+        body = {
+            'Totals': totals,
+            'Days': days,
+            'Topics': topics,
+            'Problems': problems,
+            'Items': items
+        }
+        return {
+            'headers': {
+                'Access-Control-Allow-Origin': '*'
+            },
+            'statusCode': 200,
+            'body': json.dumps(body, cls=DecimalEncoder)
+        }
+    except Exception as e:
+        print(e)
+        print("Caught error: DynamoDB error - could not read feedback stats")
+        return {
+            'headers': {
+                'Access-Control-Allow-Origin': '*'
+            },
+            'statusCode': 500,
+            'body': json.dumps('Failed to read feedback stats: ' + str(e))
+        }
+
+
 def download_feedback(event):
 
     # load parameters
     data = json.loads(event['body'])
+    # poll an export job started earlier
+    if data.get('jobId'):
+        return get_export_job(data['jobId'])
     start_time = data.get('startTime')
     end_time = data.get('endTime')
     topic = data.get('topic')
-        
-    response = None
 
-    # if topic is any, use the appropriate index
-    if not topic or topic=="any":                
-        query_kwargs = {
-            'IndexName': 'AnyIndex',
-            'KeyConditionExpression': Key('Any').eq("YES") & Key('CreatedAt').between(start_time, end_time)
+    if not start_time or not end_time:
+        return {
+            'headers': {
+                'Access-Control-Allow-Origin': "*"
+            },
+            'statusCode': 400,
+            'body': json.dumps('startTime and endTime are required')
         }
-    else:
-        query_kwargs = {
-            'KeyConditionExpression': Key('CreatedAt').between(start_time, end_time) & Key('Topic').eq(topic),            
-        }   
+
+    # ranges too large to export within the API timeout are exported by a background job
+    if data.get('async'):
+        return start_export_job(start_time, end_time, topic)
+
+    queries = feedback_queries(topic, start_time, end_time)
+    s3 = boto3.client('s3')
+    S3_DOWNLOAD_BUCKET = os.environ["FEEDBACK_S3_DOWNLOAD"]
+    file_name = f"feedback-{start_time}-{end_time}.csv"
 
     try:
-        response = table.query(**query_kwargs)
+        rows = export_feedback_csv(queries, S3MultipartWriter(s3, S3_DOWNLOAD_BUCKET, file_name))
+        print(f"Exported {rows} feedback rows to {file_name}")
     except Exception as e:
-        print("Caught error: DynamoDB error - could not load feedback for download")
+        print("Caught error: could not export feedback for download")
         return {
             'headers': {
                 'Access-Control-Allow-Origin': "*"
@@ -129,28 +385,9 @@ def download_feedback(event):
             'statusCode': 500,
             'body': json.dumps('Failed to retrieve feedback for download: ' + str(e))
         }
-    
-    
-    def clean_csv(field):
-        print("working")
-        field = str(field).replace('"', '""')
-        field = field.replace('\n','').replace(',', '')
-        return f'{field}'
-    
-    csv_content = "FeedbackID, SessionID, UserPrompt, FeedbackComment, Topic, Problem, Feedback, ChatbotMessage, CreatedAt\n"
-    
-    for item in response['Items']:
-        csv_content += f"{clean_csv(item['FeedbackID'])}, {clean_csv(item['SessionID'])}, {clean_csv(item['UserPrompt'])}, {clean_csv(item['FeedbackComments'])}, {clean_csv(item['Topic'])}, {clean_csv(item['Problem'])}, {clean_csv(item['Feedback'])}, {clean_csv(item['ChatbotMessage'])}, {clean_csv(item['CreatedAt'])}\n"
-        print(csv_content)
-    
-    s3 = boto3.client('s3')
-    S3_DOWNLOAD_BUCKET = os.environ["FEEDBACK_S3_DOWNLOAD"]
 
     try:
-        file_name = f"feedback-{start_time}-{end_time}.csv"
-        s3.put_object(Bucket=S3_DOWNLOAD_BUCKET, Key=file_name, Body=csv_content)
         presigned_url = s3.generate_presigned_url('get_object', Params={'Bucket': S3_DOWNLOAD_BUCKET, 'Key': file_name}, ExpiresIn=3600)
-
     except Exception as e:
         print("Caught error: S3 error - could not generate download link")
         return {
@@ -167,6 +404,278 @@ def download_feedback(event):
         'statusCode': 200,
         'body': json.dumps({'download_url': presigned_url})
     }
+
+
+# Queries for the feedback of one topic, or of every topic through each AnyIndex partition, created between
+# start_time and end_time
+def feedback_queries(topic, start_time, end_time):
+    # if topic is any, use the appropriate index
+    if not topic or topic=="any":
+        return [{
+            'IndexName': 'AnyIndex',
+            'KeyConditionExpression': Key('Any').eq(partition) & Key('CreatedAt').between(start_time, created_at_end(end_time))
+        } for partition in any_partitions()]
+    return [{
+        'KeyConditionExpression': Key('Topic').eq(topic) & Key('CreatedAt').between(start_time, created_at_end(end_time)),
+    }]
+
+
+# Items of one query in order, page by page. The next page is fetched on the pool while the current one is
+# consumed, and the first request is sent before this returns, so several queries started in a row run in parallel.
+def query_items(pool, query_kwargs):
+    def items(future, query_kwargs):
+        while future is not None:
+            response = future.result()
+            future = None
+            if 'LastEvaluatedKey' in response:
+                query_kwargs = {**query_kwargs, 'ExclusiveStartKey': response['LastEvaluatedKey']}
+                future = pool.submit(query_table, table, **query_kwargs)
+            yield from response.get('Items', [])
+    return items(pool.submit(query_table, table, **query_kwargs), query_kwargs)
+
+
+# Query a table from a pool thread. Table resources must not be shared between threads; the resource's client
+# can be, and it takes the same Python values and Key conditions as the table.
+def query_table(table, **query_kwargs):
+    return dynamodb.meta.client.query(TableName=table.name, **query_kwargs)
+
+
+# Write every feedback item matched by the queries as a CSV row (RFC 4180, the csv module's default dialect),
+# in CreatedAt order across queries, one query page at a time so memory use does not grow with the export.
+# Items created at or after `before` are skipped. Returns the number of rows written.
+def write_feedback_rows(queries, writer, before=None):
+    # only the exported attributes are sent back, the Sources lists stay in the table
+    projection = {
+        'ProjectionExpression': ', '.join(f'#{column}' for column in EXPORT_COLUMNS),
+        'ExpressionAttributeNames': {f'#{column}': column for column in EXPORT_COLUMNS}
+    }
+    rows = 0
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        streams = [query_items(pool, {**query_kwargs, **projection}) for query_kwargs in queries]
+        for item in heapq.merge(*streams, key=lambda item: item['CreatedAt']):
+            if before is None or item['CreatedAt'] < before:
+                writer.writerow(export_row(item))
+                rows += 1
+    return rows
+
+
+# CSV row of a feedback item, with the time of its CreatedAt key
+def export_row(item):
+    row = [item.get(column, '') for column in EXPORT_COLUMNS]
+    row[EXPORT_COLUMNS.index('CreatedAt')] = created_at_time(item['CreatedAt'])
+    return row
+
+
+# Export the feedback matched by the queries as CSV, with a header row, to `out`. Returns the number of rows.
+def export_feedback_csv(queries, out):
+    try:
+        writer = csv.writer(out)
+        writer.writerow(EXPORT_HEADER)
+        rows = write_feedback_rows(queries, writer)
+        out.close()
+    except Exception:
+        out.abort()
+        raise
+    return rows
+
+
+def export_job_key(job_id, name):
+    return f"{EXPORT_JOB_PREFIX}{job_id}/{name}"
+
+
+# Identical requests map to the same job, which lets a recent export be handed out again
+def export_job_id(start_time, end_time, topic):
+    request = json.dumps({'startTime': start_time, 'endTime': end_time, 'topic': topic or 'any'}, sort_keys=True)
+    return hashlib.sha256(request.encode('utf-8')).hexdigest()[:32]
+
+
+# A job's status document and its age in seconds, or (None, None) if the job does not exist
+def read_export_status(s3, bucket, job_id):
+    try:
+        response = s3.get_object(Bucket=bucket, Key=export_job_key(job_id, 'status.json'))
+    except s3.exceptions.NoSuchKey:
+        return None, None
+    age = (datetime.now(timezone.utc) - response['LastModified']).total_seconds()
+    return json.loads(response['Body'].read()), age
+
+
+def write_export_status(s3, bucket, job_id, status):
+    s3.put_object(Bucket=bucket, Key=export_job_key(job_id, 'status.json'), Body=json.dumps(status),
+                  ContentType='application/json')
+
+
+# Start an export job, or hand out the job of an identical request that is still running or finished recently
+def start_export_job(start_time, end_time, topic):
+    s3 = boto3.client('s3')
+    S3_DOWNLOAD_BUCKET = os.environ["FEEDBACK_S3_DOWNLOAD"]
+    job_id = export_job_id(start_time, end_time, topic)
+    try:
+        status, age = read_export_status(s3, S3_DOWNLOAD_BUCKET, job_id)
+        reusable = status is not None and (
+            (status['status'] == 'complete' and age < EXPORT_REUSE_SECONDS) or
+            (status['status'] in ('queued', 'running') and age < EXPORT_STALE_SECONDS))
+        if reusable:
+            return get_export_job(job_id)
+        request = {'jobId': job_id, 'startTime': start_time, 'endTime': end_time, 'topic': topic or 'any'}
+        write_export_status(s3, S3_DOWNLOAD_BUCKET, job_id, {**request, 'status': 'queued'})
+        s3.put_object(Bucket=S3_DOWNLOAD_BUCKET, Key=export_job_key(job_id, 'request.json'), Body=json.dumps(request),
+                      ContentType='application/json')
+    except Exception as e:
+        print("Caught error: S3 error - could not start feedback export job")
+        return {
+            'headers': {
+                'Access-Control-Allow-Origin': "*"
+            },
+            'statusCode': 500,
+            'body': json.dumps('Failed to start feedback export: ' + str(e))
+        }
+    return {
+        'headers': {
+            'Access-Control-Allow-Origin': "*"
+        },
+        'statusCode': 202,
+        'body': json.dumps({'jobId': job_id, 'status': 'queued'})
+    }
+
+
+# Status of an export job, with a download link once it is complete
+def get_export_job(job_id):
+    s3 = boto3.client('s3')
+    S3_DOWNLOAD_BUCKET = os.environ["FEEDBACK_S3_DOWNLOAD"]
+    try:
+        status, _ = read_export_status(s3, S3_DOWNLOAD_BUCKET, str(job_id))
+        if status is None:
+            return {
+                'headers': {
+                    'Access-Control-Allow-Origin': "*"
+                },
+                'statusCode': 404,
+                'body': json.dumps(f'No export job with id: {job_id}')
+            }
+        if status['status'] == 'complete':
+            status['download_url'] = s3.generate_presigned_url(
+                'get_object', Params={'Bucket': S3_DOWNLOAD_BUCKET, 'Key': export_job_key(job_id, 'feedback.csv')}, ExpiresIn=3600)
+    except Exception as e:
+        print("Caught error: S3 error - could not read feedback export job")
+        return {
+            'headers': {
+                'Access-Control-Allow-Origin': "*"
+            },
+            'statusCode': 500,
+            'body': json.dumps('Failed to read feedback export: ' + str(e))
+        }
+    return {
+        'headers': {
+            'Access-Control-Allow-Origin': "*"
+        },
+        'statusCode': 200,
+        'body': json.dumps(status)
+    }
+
+
+# Split [start_time, end_time] into up to EXPORT_SLICES consecutive ranges of equal length. Each slice is
+# (lower bound, upper bound, exclusive upper bound); the exclusive bound is None for the last slice. Ranges
+# whose bounds are not ISO dates are not split.
+def export_slices(start_time, end_time):
+    try:
+        start = datetime.fromisoformat(start_time.replace('Z', ''))
+        end = datetime.fromisoformat(end_time.replace('Z', ''))
+    except ValueError:
+        return [(start_time, end_time, None)]
+    step = (end - start) / EXPORT_SLICES
+    inner = [(start + step * i).strftime(CREATED_AT_FORMAT) for i in range(1, EXPORT_SLICES)]
+    # slice bounds must sort strictly between the request's own bounds in string order too
+    bounds = [start_time] + sorted(set(bound for bound in inner if start_time < bound < end_time)) + [end_time]
+    return [(bounds[i], bounds[i + 1], bounds[i + 1] if i + 2 < len(bounds) else None) for i in range(len(bounds) - 1)]
+
+
+# Query one slice into a temporary CSV file, returning the file and its row count
+def export_slice(topic, lower, upper, before):
+    part = tempfile.TemporaryFile(mode='w+', newline='', encoding='utf-8')
+    try:
+        rows = write_feedback_rows(feedback_queries(topic, lower, upper), csv.writer(part), before)
+    except Exception:
+        part.close()
+        raise
+    return part, rows
+
+
+# Run an export job: query the time slices in parallel, then append them in CreatedAt order to one CSV object
+def run_export_job(request):
+    s3 = boto3.client('s3')
+    S3_DOWNLOAD_BUCKET = os.environ["FEEDBACK_S3_DOWNLOAD"]
+    job_id = request['jobId']
+    write_export_status(s3, S3_DOWNLOAD_BUCKET, job_id, {**request, 'status': 'running'})
+    parts = []
+    try:
+        slices = export_slices(request['startTime'], request['endTime'])
+        with ThreadPoolExecutor(max_workers=len(slices)) as pool:
+            futures = [pool.submit(export_slice, request['topic'], *bounds) for bounds in slices]
+            for future in futures:
+                parts.append(future.result())
+        out = S3MultipartWriter(s3, S3_DOWNLOAD_BUCKET, export_job_key(job_id, 'feedback.csv'))
+        try:
+            csv.writer(out).writerow(EXPORT_HEADER)
+            for part, _ in parts:
+                part.seek(0)
+                while chunk := part.read(EXPORT_PART_SIZE):
+                    out.write(chunk)
+            out.close()
+        except Exception:
+            out.abort()
+            raise
+        rows = sum(rows for _, rows in parts)
+        write_export_status(s3, S3_DOWNLOAD_BUCKET, job_id, {**request, 'status': 'complete', 'rows': rows})
+        print(f"Exported {rows} feedback rows for job {job_id}")
+    except Exception as e:
+        print(f"Caught error: could not run feedback export job {job_id}: {e}")
+        write_export_status(s3, S3_DOWNLOAD_BUCKET, job_id, {**request, 'status': 'failed', 'error': str(e)})
+    finally:
+        for part, _ in parts:
+            part.close()
+
+
+# Entry point of the export function, invoked by S3 for every export job request object written
+def export_job_handler(event, context):
+    s3 = boto3.client('s3')
+    for record in event.get('Records', []):
+        bucket = record['s3']['bucket']['name']
+        key = unquote_plus(record['s3']['object']['key'])
+        request = json.loads(s3.get_object(Bucket=bucket, Key=key)['Body'].read())
+        run_export_job(request)
+
+
+# File-like target for csv.writer that streams into an S3 multipart upload, holding at most one part in memory
+class S3MultipartWriter:
+    def __init__(self, s3, bucket, key):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, ContentType='text/csv')['UploadId']
+        self.parts = []
+        self.buffer = io.BytesIO()
+
+    def write(self, text):
+        self.buffer.write(text.encode('utf-8'))
+        if self.buffer.tell() >= EXPORT_PART_SIZE:
+            self.upload_part()
+
+    def upload_part(self):
+        part_number = len(self.parts) + 1
+        response = self.s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                       PartNumber=part_number, Body=self.buffer.getvalue())
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.buffer = io.BytesIO()
+
+    def close(self):
+        # the last part may be smaller than the 5 MB minimum
+        if self.buffer.tell() or not self.parts:
+            self.upload_part()
+        self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                          MultipartUpload={'Parts': self.parts})
+
+    def abort(self):
+        self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
         
 
 def get_feedback(event):
@@ -177,34 +686,36 @@ def get_feedback(event):
         end_time = query_params.get('endTime')
         topic = query_params.get('topic')
         exclusive_start_key = query_params.get('nextPageToken')  # Pagination token        
+        list_view = query_params.get('view') == 'list'
+        page_size = min(max(int(query_params.get('pageSize') or FEEDBACK_PAGE_SIZE), 1), MAX_FEEDBACK_PAGE_SIZE)
         
-        response = None        
-        
-        if not topic or topic=="any":        
-            query_kwargs = {
-                'IndexName' : 'AnyIndex',
-                'KeyConditionExpression': Key('Any').eq("YES") & Key('CreatedAt').between(start_time, end_time),
-                'ScanIndexForward' : False,
-                'Limit' : 10
-            } 
+        if not topic or topic=="any":
+            items, next_page_token = get_any_feedback_page(start_time, end_time, exclusive_start_key, page_size, list_view)
+            body = {
+                'Items': items,
+            }
+            if next_page_token:
+                body['NextPageToken'] = next_page_token
         else:
             query_kwargs = {
-                'KeyConditionExpression': Key('CreatedAt').between(start_time, end_time) & Key('Topic').eq(topic),
+                'KeyConditionExpression': Key('Topic').eq(topic) & Key('CreatedAt').between(start_time, created_at_end(end_time)),
                 'ScanIndexForward' : False,
-                'Limit' : 10
+                'Limit' : page_size
             }
+            if list_view:
+                query_kwargs['IndexName'] = 'TopicListIndex'
+                query_kwargs.update(list_projection())
+            if exclusive_start_key:
+                query_kwargs['ExclusiveStartKey'] = json.loads(exclusive_start_key)
 
-        if exclusive_start_key:
-            query_kwargs['ExclusiveStartKey'] = json.loads(exclusive_start_key)
-        
-        response = table.query(**query_kwargs)
-        
-        body = {
-            'Items':  response['Items'],            
-        }
-        
-        if 'LastEvaluatedKey' in response:
-            body['NextPageToken'] = json.dumps(response['LastEvaluatedKey'])
+            response = table.query(**query_kwargs)
+
+            body = {
+                'Items':  response['Items'],
+            }
+
+            if 'LastEvaluatedKey' in response:
+                body['NextPageToken'] = json.dumps(response['LastEvaluatedKey'])
 
         return {
             'headers': {
@@ -223,6 +734,89 @@ def get_feedback(event):
             'body': json.dumps('Failed to retrieve feedback: ' + str(e))
         }
         
+def list_projection():
+    return {
+        'ProjectionExpression': ', '.join(f'#{column}' for column in LIST_COLUMNS),
+        'ExpressionAttributeNames': {f'#{column}': column for column in LIST_COLUMNS}
+    }
+
+
+# One page of feedback of every topic, newest first. Every AnyIndex partition is queried for a page in parallel
+# and the results are merged by CreatedAt. The page token maps each partition that may still have items to
+# the key of the last item taken from it (null if none has been taken yet). In list mode the narrow
+# AnyListIndex is read instead; it has the same keys, so page tokens work with either index.
+def get_any_feedback_page(start_time, end_time, page_token=None, page_size=FEEDBACK_PAGE_SIZE, list_view=False):
+    cursors = json.loads(page_token) if page_token else dict.fromkeys(any_partitions())
+    with ThreadPoolExecutor(max_workers=len(cursors)) as pool:
+        futures = {}
+        for partition, cursor in cursors.items():
+            query_kwargs = {
+                'IndexName': 'AnyListIndex' if list_view else 'AnyIndex',
+                'KeyConditionExpression': Key('Any').eq(partition) & Key('CreatedAt').between(start_time, created_at_end(end_time)),
+                'ScanIndexForward': False,
+                'Limit': page_size
+            }
+            if list_view:
+                query_kwargs.update(list_projection())
+            if cursor:
+                query_kwargs['ExclusiveStartKey'] = cursor
+            futures[partition] = pool.submit(query_table, table, **query_kwargs)
+        responses = {partition: future.result() for partition, future in futures.items()}
+
+    streams = [[(item, partition) for item in response['Items']] for partition, response in responses.items()]
+    page = list(islice(heapq.merge(*streams, key=lambda entry: entry[0]['CreatedAt'], reverse=True), page_size))
+    taken = dict.fromkeys(responses, 0)
+    for item, partition in page:
+        taken[partition] += 1
+        cursors[partition] = {'Any': item['Any'], 'Topic': item['Topic'], 'CreatedAt': item['CreatedAt']}
+
+    # partitions that returned all their remaining items and had every one of them taken are done
+    next_cursors = {partition: cursors[partition] for partition, response in responses.items()
+                    if taken[partition] < len(response['Items']) or 'LastEvaluatedKey' in response}
+    return [item for item, _ in page], json.dumps(next_cursors) if next_cursors else None
+
+
+# One whole feedback item, by the topic and createdAt key that get_feedback returns for it
+def get_feedback_item(event):
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        topic = query_params.get('topic')
+        created_at = query_params.get('createdAt')
+        if not topic or not created_at:
+            return {
+                'headers': {
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'statusCode': 400,
+                'body': json.dumps('Missing topic or createdAt')
+            }
+        response = table.get_item(Key={'Topic': topic, 'CreatedAt': created_at})
+        if 'Item' not in response:
+            return {
+                'headers': {
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'statusCode': 404,
+                'body': json.dumps('Feedback not found')
+            }
+        return {
+            'headers': {
+                'Access-Control-Allow-Origin': '*'
+            },
+            'statusCode': 200,
+            'body': json.dumps(response['Item'], cls=DecimalEncoder)
+        }
+    except Exception as e:
+        print("Caught error: DynamoDB error - could not get feedback item")
+        return {
+            'headers': {
+                'Access-Control-Allow-Origin': '*'
+            },
+            'statusCode': 500,
+            'body': json.dumps('Failed to retrieve feedback: ' + str(e))
+        }
+
+
 def delete_feedback(event):
     try:
         # Extract FeedbackID from the event
@@ -231,21 +825,26 @@ def delete_feedback(event):
         topic = query_params.get('topic')
         created_at = query_params.get('createdAt')
         
-        if not topic:
+        if not topic or not created_at:
             return {
                 'headers': {
                     'Access-Control-Allow-Origin': '*'
                 },
                 'statusCode': 400,
-                'body': json.dumps('Missing FeedbackID')
+                'body': json.dumps('Missing topic or createdAt')
             }
-        # Delete the item from the DynamoDB table
+        # Delete the item from the DynamoDB table, createdAt is the whole key (with the FeedbackID if it has one)
         response = table.delete_item(
             Key={
                 'Topic': topic,
                 'CreatedAt' : created_at
-            }
+            },
+            ReturnValues='ALL_OLD'
         )
+        # Take the deleted feedback back out of the counters, unless it was never counted: feedback stored before
+        # the counters existed, or whose counters could not be updated, has no StatsShard
+        if 'StatsShard' in response.get('Attributes', {}):
+            update_stats(response['Attributes'], -1)
         return {
             'headers': {
                 'Access-Control-Allow-Origin': '*'
@@ -9,11 +9,13 @@ interface LambdaFunctionStackProps {
     readonly wsApiEndpoint: string;
     readonly sessionTable: Table;
     readonly feedbackTable: Table;
+    readonly feedbackStatsTable: Table;
     readonly feedbackBucket: s3.Bucket;
     readonly knowledgeBucket: s3.Bucket;
     readonly knowledgeBase: bedrock.CfnKnowledgeBase;
     readonly knowledgeBaseSource: bedrock.CfnDataSource;
     readonly evalTestCasesBucket: s3.Bucket;
+    readonly sessionArchiveBucket: s3.Bucket;
     readonly stagedSystemPromptsTable: Table;
     readonly activeSystemPromptsTable: Table;
     readonly evalSummariesTable: Table;
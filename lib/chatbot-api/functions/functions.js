@@ -8,6 +8,8 @@ const lambda = require("aws-cdk-lib/aws-lambda");
 const aws_lambda_event_sources_1 = require("aws-cdk-lib/aws-lambda-event-sources");
 const iam = require("aws-cdk-lib/aws-iam");
 const s3 = require("aws-cdk-lib/aws-s3");
+const events = require("aws-cdk-lib/aws-events");
+const targets = require("aws-cdk-lib/aws-events-targets");
 const step_functions_1 = require("./step-functions/step-functions");
 class LambdaFunctionStack extends cdk.Stack {
     constructor(scope, id, props) {
@@ -17,7 +19,11 @@ class LambdaFunctionStack extends cdk.Stack {
             code: lambda.Code.fromAsset(path.join(__dirname, 'session-handler')),
             handler: 'lambda_function.lambda_handler',
             environment: {
-                "DDB_TABLE_NAME": props.sessionTable.tableName
+                "DDB_TABLE_NAME": props.sessionTable.tableName,
+                "SESSION_STORAGE_LAYOUT": "message",
+                "SESSION_HISTORY_COMPRESSION": "zlib",
+                "SESSION_ARCHIVE_BUCKET": props.sessionArchiveBucket.bucketName,
+                "SESSION_SUMMARY_EVERY_TURNS": "6"
             },
             timeout: cdk.Duration.seconds(30)
         });
@@ -25,15 +31,88 @@ class LambdaFunctionStack extends cdk.Stack {
             effect: iam.Effect.ALLOW,
             actions: [
                 'dynamodb:GetItem',
+                'dynamodb:BatchGetItem',
                 'dynamodb:PutItem',
                 'dynamodb:UpdateItem',
                 'dynamodb:DeleteItem',
                 'dynamodb:Query',
-                'dynamodb:Scan'
+                'dynamodb:Scan',
+                'dynamodb:BatchWriteItem'
             ],
             resources: [props.sessionTable.tableArn, props.sessionTable.tableArn + "/index/*"]
         }));
+        props.sessionArchiveBucket.grantReadWrite(sessionAPIHandlerFunction);
         this.sessionFunction = sessionAPIHandlerFunction;
+        // Moves sessions idle for SESSION_ARCHIVE_AFTER_DAYS to the archive bucket, once a day
+        const sessionArchiveFunction = new lambda.Function(scope, 'SessionArchiveFunction', {
+            runtime: lambda.Runtime.PYTHON_3_12,
+            code: lambda.Code.fromAsset(path.join(__dirname, 'session-handler')),
+            handler: 'lambda_function.archive_handler',
+            environment: {
+                "DDB_TABLE_NAME": props.sessionTable.tableName,
+                "SESSION_STORAGE_LAYOUT": "message",
+                "SESSION_HISTORY_COMPRESSION": "zlib",
+                "SESSION_ARCHIVE_BUCKET": props.sessionArchiveBucket.bucketName,
+                "SESSION_ARCHIVE_AFTER_DAYS": "180"
+            },
+            timeout: cdk.Duration.minutes(15)
+        });
+        sessionArchiveFunction.addToRolePolicy(new iam.PolicyStatement({
+            effect: iam.Effect.ALLOW,
+            actions: [
+                'dynamodb:GetItem',
+                'dynamodb:PutItem',
+                'dynamodb:UpdateItem',
+                'dynamodb:DeleteItem',
+                'dynamodb:Query',
+                'dynamodb:Scan',
+                'dynamodb:BatchWriteItem'
+            ],
+            resources: [props.sessionTable.tableArn, props.sessionTable.tableArn + "/index/*"]
+        }));
+        props.sessionArchiveBucket.grantReadWrite(sessionArchiveFunction);
+        new events.Rule(scope, 'SessionArchiveSchedule', {
+            schedule: events.Schedule.cron({ minute: '0', hour: '7' }),
+            targets: [new targets.LambdaFunction(sessionArchiveFunction)]
+        });
+        // Summary refreshes, layout migrations and search index backfills. Only invoked directly (by the chat
+        // function or an operator), never through the API
+        const sessionMaintenanceFunction = new lambda.Function(scope, 'SessionMaintenanceFunction', {
+            runtime: lambda.Runtime.PYTHON_3_12,
+            code: lambda.Code.fromAsset(path.join(__dirname, 'session-handler')),
+            handler: 'lambda_function.maintenance_handler',
+            environment: {
+                "DDB_TABLE_NAME": props.sessionTable.tableName,
+                "SESSION_STORAGE_LAYOUT": "message",
+                "SESSION_HISTORY_COMPRESSION": "zlib",
+                "SUMMARY_MODEL_ID": "anthropic.claude-3-haiku-20240307-v1:0"
+            },
+            timeout: cdk.Duration.minutes(15)
+        });
+        sessionMaintenanceFunction.addToRolePolicy(new iam.PolicyStatement({
+            effect: iam.Effect.ALLOW,
+            actions: [
+                'dynamodb:GetItem',
+                'dynamodb:PutItem',
+                'dynamodb:UpdateItem',
+                'dynamodb:Query',
+                'dynamodb:BatchWriteItem'
+            ],
+            resources: [props.sessionTable.tableArn, props.sessionTable.tableArn + "/index/*"]
+        }));
+        // refresh_summary condenses long sessions with a small model
+        sessionMaintenanceFunction.addToRolePolicy(new iam.PolicyStatement({
+            effect: iam.Effect.ALLOW,
+            actions: ['bedrock:InvokeModel'],
+            resources: ['arn:aws:bedrock:us-east-1::foundation-model/anthropic.claude-3-haiku-20240307-v1:0']
+        }));
+        // appended turns are indexed in the background by the maintenance function
+        sessionAPIHandlerFunction.addEnvironment("SESSION_MAINTENANCE_FUNCTION", sessionMaintenanceFunction.functionName);
+        sessionAPIHandlerFunction.addToRolePolicy(new iam.PolicyStatement({
+            effect: iam.Effect.ALLOW,
+            actions: ['lambda:InvokeFunction'],
+            resources: [sessionMaintenanceFunction.functionArn]
+        }));
         const systemPromptsAPIHandlerFunction = new lambda.Function(scope, 'SystemPromptsHandlerFunction', {
             runtime: lambda.Runtime.PYTHON_3_12,
             code: lambda.Code.fromAsset(path.join(__dirname, 'knowledge-management/system-prompt-handler')),
@@ -71,6 +150,7 @@ class LambdaFunctionStack extends cdk.Stack {
                 // "PROMPT" : `You are a helpful AI chatbot that will answer questions based on your knowledge. 
                 // You have access to a search tool that you will use to look up answers to questions.`,
                 'SESSION_HANDLER': sessionAPIHandlerFunction.functionName,
+                'SESSION_MAINTENANCE_FUNCTION': sessionMaintenanceFunction.functionName,
                 'SYSTEM_PROMPTS_HANDLER': systemPromptsAPIHandlerFunction.functionName,
                 'KB_ID': props.knowledgeBase.attrKnowledgeBaseId,
                 'CONFL_PROMPT': `You are a knowledge expert looking to either identify conflicts among the 
@@ -129,7 +209,7 @@ class LambdaFunctionStack extends cdk.Stack {
             actions: [
                 'lambda:InvokeFunction'
             ],
-            resources: [this.sessionFunction.functionArn]
+            resources: [this.sessionFunction.functionArn, sessionMaintenanceFunction.functionArn]
         }));
         this.chatFunction = websocketAPIFunction;
         const feedbackAPIHandlerFunction = new lambda.Function(scope, 'FeedbackHandlerFunction', {
@@ -138,9 +218,12 @@ class LambdaFunctionStack extends cdk.Stack {
             handler: 'lambda_function.lambda_handler',
             environment: {
                 "FEEDBACK_TABLE": props.feedbackTable.tableName,
+                "FEEDBACK_STATS_TABLE": props.feedbackStatsTable.tableName,
                 "FEEDBACK_S3_DOWNLOAD": props.feedbackBucket.bucketName
             },
-            timeout: cdk.Duration.seconds(30)
+            timeout: cdk.Duration.seconds(30),
+            // CSV exports hold one 8 MB upload part in memory, and more memory also means more CPU
+            memorySize: 512
         });
         feedbackAPIHandlerFunction.addToRolePolicy(new iam.PolicyStatement({
             effect: iam.Effect.ALLOW,
@@ -154,6 +237,15 @@ class LambdaFunctionStack extends cdk.Stack {
             ],
             resources: [props.feedbackTable.tableArn, props.feedbackTable.tableArn + "/index/*"]
         }));
+        // Feedback counters, updated after each post and delete and read by the stats route
+        feedbackAPIHandlerFunction.addToRolePolicy(new iam.PolicyStatement({
+            effect: iam.Effect.ALLOW,
+            actions: [
+                'dynamodb:UpdateItem',
+                'dynamodb:Query'
+            ],
+            resources: [props.feedbackStatsTable.tableArn]
+        }));
         feedbackAPIHandlerFunction.addToRolePolicy(new iam.PolicyStatement({
             effect: iam.Effect.ALLOW,
             actions: [
@@ -162,6 +254,32 @@ class LambdaFunctionStack extends cdk.Stack {
             resources: [props.feedbackBucket.bucketArn, props.feedbackBucket.bucketArn + "/*"]
         }));
         this.feedbackFunction = feedbackAPIHandlerFunction;
+        // Runs feedback export jobs, started by the request object download-feedback writes in async mode
+        const feedbackExportFunction = new lambda.Function(scope, 'FeedbackExportFunction', {
+            runtime: lambda.Runtime.PYTHON_3_12,
+            code: lambda.Code.fromAsset(path.join(__dirname, 'feedback-handler')),
+            handler: 'lambda_function.export_job_handler',
+            environment: {
+                "FEEDBACK_TABLE": props.feedbackTable.tableName,
+                "FEEDBACK_S3_DOWNLOAD": props.feedbackBucket.bucketName
+            },
+            timeout: cdk.Duration.minutes(15),
+            memorySize: 1024,
+            // time slices are staged in /tmp before they are merged into one object
+            ephemeralStorageSize: cdk.Size.gibibytes(4)
+        });
+        feedbackExportFunction.addToRolePolicy(new iam.PolicyStatement({
+            effect: iam.Effect.ALLOW,
+            actions: [
+                'dynamodb:Query'
+            ],
+            resources: [props.feedbackTable.tableArn, props.feedbackTable.tableArn + "/index/*"]
+        }));
+        props.feedbackBucket.grantReadWrite(feedbackExportFunction);
+        feedbackExportFunction.addEventSource(new aws_lambda_event_sources_1.S3EventSource(props.feedbackBucket, {
+            events: [s3.EventType.OBJECT_CREATED],
+            filters: [{ prefix: 'export-jobs/', suffix: 'request.json' }]
+        }));
         const deleteS3APIHandlerFunction = new lambda.Function(scope, 'DeleteS3FilesHandlerFunction', {
             runtime: lambda.Runtime.PYTHON_3_12,
             code: lambda.Code.fromAsset(path.join(__dirname, 'knowledge-management/delete-s3')),
@@ -0,0 +1,34 @@
+# Compact storage for chat history entries.
+#
+# A packed entry is a DynamoDB binary value: one format version byte followed by the payload.
+# Version 1 is the entry as compact JSON, zlib-compressed. Entries that are still stored as plain
+# maps are returned as they are, so readers never need to know how an entry was written.
+import json
+import zlib
+from decimal import Decimal
+
+FORMAT_ZLIB_JSON = 1
+# zlib level 6 is the default trade-off; higher levels barely shrink chat text further
+COMPRESSION_LEVEL = 6
+
+
+# Numbers read back from DynamoDB are Decimal, store them as plain JSON numbers
+def json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value % 1 == 0 else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_entry(entry):
+    payload = json.dumps(entry, separators=(",", ":"), ensure_ascii=False, default=json_default).encode("utf-8")
+    return bytes([FORMAT_ZLIB_JSON]) + zlib.compress(payload, COMPRESSION_LEVEL)
+
+
+def decode_entry(value):
+    # boto3 wraps binary attributes in boto3.dynamodb.types.Binary
+    value = getattr(value, "value", value)
+    if not isinstance(value, (bytes, bytearray)):
+        return value
+    if not value or value[0] != FORMAT_ZLIB_JSON:
+        raise ValueError(f"Unknown chat history format version: {value[:1].hex() or 'empty'}")
+    return json.loads(zlib.decompress(bytes(value[1:])).decode("utf-8"))
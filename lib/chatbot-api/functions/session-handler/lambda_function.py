@@ -1,20 +1,200 @@
 import os
+import base64
+import heapq
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
+from history_codec import encode_entry, decode_entry
+import session_archive
+import session_search
+import session_summary
 
 # Retrieve DynamoDB table and secondary index names from environment variables
 DDB_TABLE_NAME = os.environ["DDB_TABLE_NAME"]
 # DDB_SECONDARY_INDEX_NAME = os.environ["DDB_SECONDARY_INDEX_NAME"]
 
+# 'item' keeps a session's whole chat_history on one item, 'message' writes a session header item plus
+# one item per message (sort key session_id#000123). Only new sessions follow this setting, existing
+# sessions keep the layout they were created with until they are migrated with migrate_session.
+SESSION_STORAGE_LAYOUT = os.environ.get("SESSION_STORAGE_LAYOUT", "item")
+# 'zlib' stores each message item's entry as a compressed binary value (see history_codec), 'none' as a map.
+# Reads decode either form, so this can be switched at any time.
+SESSION_HISTORY_COMPRESSION = os.environ.get("SESSION_HISTORY_COMPRESSION", "none")
+# Attempts at appending to a session in the 'message' layout while other appends to it race with this one
+APPEND_ATTEMPTS = 5
+# Message indices are zero-padded to this many digits so they sort in order
+MESSAGE_INDEX_DIGITS = 6
+MAX_MESSAGE_INDEX = 10 ** MESSAGE_INDEX_DIGITS - 1
+
+# Sessions whose last activity is older than this many days are moved to S3 by archive_idle_sessions
+SESSION_ARCHIVE_AFTER_DAYS = int(os.environ.get("SESSION_ARCHIVE_AFTER_DAYS", "180"))
+# The archive and maintenance jobs stop picking up new work when less than this much of their invocation time is left
+ARCHIVE_TIME_MARGIN_MS = 60000
+
+# GSI on user_id/time_stamp that projects only title besides the keys, so listing reads no chat history
+SESSION_LIST_INDEX = "SessionListIndex"
+MAX_SESSION_PAGE_SIZE = 100
+
+# Batch operations: BatchWriteItem takes at most 25 requests and BatchGetItem 100 keys, calls are spread
+# over a bounded pool of threads and unprocessed requests retried with backoff
+DELETE_BATCH_SIZE = 25
+BATCH_GET_SIZE = 100
+MAX_SESSIONS_PER_GET = 100
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "8"))
+BATCH_MAX_ATTEMPTS = 6
+
+# append_turn reports summary_due once this many messages are neither in a session's rolling summary nor
+# among the SUMMARY_TAIL_TURNS newest messages the chat Lambda always sends verbatim (0 turns summaries off)
+SESSION_SUMMARY_EVERY_TURNS = int(os.environ.get("SESSION_SUMMARY_EVERY_TURNS", "6"))
+SUMMARY_TAIL_TURNS = 2
+
+# Most sessions search_sessions returns
+MAX_SEARCH_RESULTS = 50
+# Internal function that indexes appended turns in the background, see maintenance_handler
+SESSION_MAINTENANCE_FUNCTION = os.environ.get("SESSION_MAINTENANCE_FUNCTION", "")
+
 # Initialize a DynamoDB resource using boto3 with a specific AWS region
 dynamodb = boto3.resource("dynamodb", region_name='us-east-1')
 # Connect to the specified DynamoDB table
 table = dynamodb.Table(DDB_TABLE_NAME)
+lambda_client = boto3.client("lambda", region_name='us-east-1')
+
+# Numbers such as the version counter come back from DynamoDB as Decimal
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return int(obj) if obj % 1 == 0 else float(obj)
+        return json.JSONEncoder.default(self, obj)
+
+
+# Sort key of the item holding message `index` of a session stored in the 'message' layout
+def message_key(session_id, index):
+    return f"{session_id}#{index:0{MESSAGE_INDEX_DIGITS}d}"
+
+
+# Item holding message `index` of a session in the 'message' layout
+def message_item(user_id, session_id, index, entry):
+    return {
+        "user_id": user_id,
+        "session_id": message_key(session_id, index),
+        "message_index": index,
+        "entry": encode_entry(entry) if SESSION_HISTORY_COMPRESSION == "zlib" else entry
+    }
+
+
+# Chat entry of a message item; a conflict report is stored next to the entry so packed entries stay untouched
+def message_entry(item, sources):
+    entry = rehydrate_sources(decode_entry(item["entry"]), sources)
+    if "conflict_report" in item:
+        entry = {**entry, "conflict_report": item["conflict_report"]}
+    return entry
+
+
+# Sessions in the 'message' layout keep every distinct source once, in the header's `sources` list, and
+# messages keep indices into it (`source_refs`) instead of the JSON string in `metadata`. Returns the
+# compact entry and the sources to append to the header. Entries without a JSON list of sources are kept as is.
+def intern_sources(entry, known_sources):
+    try:
+        sources = json.loads(entry.get("metadata"))
+    except (TypeError, ValueError):
+        return entry, []
+    if not isinstance(sources, list) or not all(isinstance(source, dict) for source in sources):
+        return entry, []
+    index_by_source = {json.dumps(source, sort_keys=True, cls=DecimalEncoder): index
+                       for index, source in enumerate(known_sources)}
+    new_sources = []
+    source_refs = []
+    for source in sources:
+        source_key = json.dumps(source, sort_keys=True, cls=DecimalEncoder)
+        if source_key not in index_by_source:
+            index_by_source[source_key] = len(known_sources) + len(new_sources)
+            new_sources.append(source)
+        source_refs.append(index_by_source[source_key])
+    compact_entry = {key: value for key, value in entry.items() if key != "metadata"}
+    compact_entry["source_refs"] = source_refs
+    return compact_entry, new_sources
+
+
+# Inverse of intern_sources: rebuild the `metadata` JSON string the chat Lambda originally stored
+def rehydrate_sources(entry, sources):
+    if "source_refs" not in entry:
+        return entry
+    source_refs = entry["source_refs"]
+    entry = {key: value for key, value in entry.items() if key != "source_refs"}
+    entry["metadata"] = json.dumps([sources[int(ref)] for ref in source_refs], separators=(",", ":"), cls=DecimalEncoder)
+    return entry
+
+
+# Read one session's message items with indices in [start_index, end_index], oldest first unless reverse.
+# Returns a list of (index, chat entry) pairs, stopping after `limit` messages when one is given.
+# `sources` is the header's source list that the messages' source_refs point into.
+def query_messages(user_id, session_id, start_index=0, end_index=MAX_MESSAGE_INDEX, limit=None, reverse=False, sources=()):
+    messages = []
+    query_kwargs = {
+        'KeyConditionExpression': Key('user_id').eq(user_id) & Key('session_id').between(
+            message_key(session_id, start_index), message_key(session_id, end_index)),
+        'ScanIndexForward': not reverse
+    }
+    while True:
+        if limit is not None:
+            query_kwargs['Limit'] = limit - len(messages)
+        response = table.query(**query_kwargs)
+        messages.extend((int(item['message_index']), message_entry(item, sources)) for item in response.get('Items', []))
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key or (limit is not None and len(messages) >= limit):
+            return messages
+        query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+
+# Load a session item in either layout, with chat_history assembled from message items when needed.
+# Archived sessions are restored first. With tail and/or since_index only the last `tail` messages at or after since_index are loaded; the item
+# then also carries message_count (all messages in the session) and first_index (index of chat_history[0]).
+# A session with a rolling summary also carries summary and summary_index, see refresh_summary.
+def load_session(session_id, user_id, tail=None, since_index=None, restore=True):
+    item = table.get_item(Key={"session_id": session_id, "user_id": user_id}).get("Item")
+    if not item:
+        return item
+    # an archived session is brought back from S3 on first access
+    if "archived" in item and restore and restore_archived_session(session_id, user_id, item):
+        return load_session(session_id, user_id, tail, since_index, restore=False)
+    ranged = tail is not None or since_index is not None
+    if item.get("layout") == "message":
+        message_count = int(item.get("message_count", 0))
+        start_index = first_ranged_index(message_count, tail, since_index) if ranged else 0
+        sources = item.pop("sources", [])
+        # the header already knows the message count, so only the requested messages are read
+        item["chat_history"] = [entry for _, entry in query_messages(user_id, session_id, start_index, sources=sources)] \
+            if start_index < message_count else []
+    else:
+        # a single-item session is read in full either way, only the response is trimmed
+        chat_history = item.get("chat_history", [])
+        message_count = len(chat_history)
+        start_index = first_ranged_index(message_count, tail, since_index) if ranged else 0
+        item["chat_history"] = chat_history[start_index:]
+    if ranged:
+        item["message_count"] = message_count
+        item["first_index"] = start_index
+    return item
+
+
+# Index of the first message a ranged read returns
+def first_ranged_index(message_count, tail, since_index):
+    start_index = max(0, int(since_index or 0))
+    if tail is not None:
+        start_index = max(start_index, message_count - max(0, int(tail)))
+    return min(start_index, message_count)
+
 
 # Define a function to add a session or update an existing one in the DynamoDB table
 def add_session(session_id, user_id, chat_history, title, new_chat_entry):
+    if SESSION_STORAGE_LAYOUT == "message":
+        return append_turn(session_id, user_id, new_chat_entry, title)
     try:
         # Attempt to add an item to the DynamoDB table with provided details
         response = table.put_item(
@@ -23,9 +203,11 @@ def add_session(session_id, user_id, chat_history, title, new_chat_entry):
                 'session_id': session_id,  # Unique identifier for the session
                 'chat_history': [new_chat_entry],  # List of chat history, initiating with the new entry
                 "title": title.strip(),  # Title of the session
-                "time_stamp": str(datetime.now())  # Current timestamp as a string
+                "time_stamp": str(datetime.now()),  # Current timestamp as a string
+                "version": 1  # Bumped by every append, see append_turn
             }
         )
+        request_index_turn(session_id, user_id, new_chat_entry, 0)
         # Return any attributes returned by the DynamoDB operation, default to an empty dictionary if none
         return response.get("Attributes", {})
     except ClientError as error:
@@ -43,13 +225,18 @@ def add_session(session_id, user_id, chat_history, title, new_chat_entry):
                 'body': json.dumps(str(error))}
 
 
-# A function to retrieve a session from DynamoDB based on session_id and user_id
-def get_session(session_id, user_id):
-    # Initialize a variable to hold the response from DynamoDB
-    response = {}
+# A function to retrieve a session from DynamoDB based on session_id and user_id. Pass tail to get only
+# the last messages, since_index to get only the messages a client has not seen yet, or both.
+def get_session(session_id, user_id, tail=None, since_index=None):
     try:
-        # Attempt to retrieve an item using the session_id and user_id as keys
-        response = table.get_item(Key={"session_id": session_id, "user_id": user_id})
+        # Attempt to retrieve the session using the session_id and user_id as keys
+        item = load_session(session_id, user_id, tail, since_index)
+    except (TypeError, ValueError):
+        return {
+            'statusCode': 400,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps("tail and since_index must be integers")
+        }
     except ClientError as error:
         print("Caught error: DynamoDB error - could not get session")
         # Handle specific error when the specified resource is not found in DynamoDB
@@ -74,103 +261,606 @@ def get_session(session_id, user_id):
         'headers': {
             'Access-Control-Allow-Origin': '*'  # Allow all domains for CORS
         },
-        'body': json.dumps(response.get("Item", {}))  # Convert the retrieved item to JSON format
+        'body': json.dumps(item or {}, cls=DecimalEncoder)  # Convert the retrieved item to JSON format
     }
     # Return the prepared response to the client
     return response_to_client
 
             
+# Fetch up to 100 keys with one BatchGetItem, retrying unprocessed keys with backoff. `projection` holds
+# ProjectionExpression and ExpressionAttributeNames when only some attributes are needed.
+# Returns the items found and the keys that are still unprocessed once the attempts run out.
+def batch_get_keys(keys, projection=None):
+    request_items = {DDB_TABLE_NAME: {"Keys": keys, **(projection or {})}}
+    items = []
+    for attempt in range(BATCH_MAX_ATTEMPTS):
+        if attempt:
+            backoff(attempt)
+        try:
+            response = dynamodb.meta.client.batch_get_item(RequestItems=request_items)
+        except ClientError as error:
+            if error.response['Error']['Code'] in ("ProvisionedThroughputExceededException", "ThrottlingException"):
+                continue
+            raise
+        items.extend(response.get("Responses", {}).get(DDB_TABLE_NAME, []))
+        request_items = response.get("UnprocessedKeys", {})
+        if not request_items:
+            return items, []
+    return items, request_items.get(DDB_TABLE_NAME, {}).get("Keys", [])
+
+
+# Fetch any number of keys, 100 per BatchGetItem call, on BATCH_WORKERS threads
+def batch_get_all(keys, projection=None):
+    batches = [keys[i:i + BATCH_GET_SIZE] for i in range(0, len(keys), BATCH_GET_SIZE)]
+    items = []
+    unprocessed = []
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+        for batch_items, batch_unprocessed in pool.map(lambda batch: batch_get_keys(batch, projection), batches):
+            items.extend(batch_items)
+            unprocessed.extend(batch_unprocessed)
+    return items, unprocessed
+
+
+# Load several sessions of a user in one call. Session items are fetched with BatchGetItem, then the
+# message items of sessions in the 'message' layout (only the last `tail` when given) in a second round.
+# Returns each session in get_session's format keyed by session_id, plus the ids that do not exist and
+# the ids that could not be read.
+def get_sessions(session_ids, user_id, tail=None):
+    if not isinstance(session_ids, list) or not session_ids or len(session_ids) > MAX_SESSIONS_PER_GET \
+            or not all(isinstance(session_id, str) for session_id in session_ids):
+        return {
+            'statusCode': 400,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps(f"session_ids must be a list of 1 to {MAX_SESSIONS_PER_GET} session ids")
+        }
+    try:
+        tail = None if tail is None else max(0, int(tail))
+    except (TypeError, ValueError):
+        return {
+            'statusCode': 400,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps("tail must be an integer")
+        }
+    session_ids = list(dict.fromkeys(session_ids))
+    try:
+        items, unprocessed = batch_get_all([{"user_id": user_id, "session_id": session_id} for session_id in session_ids])
+        failed = {key["session_id"] for key in unprocessed}
+        sessions = {item["session_id"]: item for item in items}
+
+        message_keys = []
+        for session_id, item in list(sessions.items()):
+            if "archived" in item:
+                # restored and read on its own, archived sessions are rare and restored only once
+                sessions[session_id] = load_session(session_id, user_id, tail) or item
+                sessions[session_id].setdefault("chat_history", [])
+            elif item.get("layout") == "message":
+                message_count = int(item.get("message_count", 0))
+                start_index = first_ranged_index(message_count, tail, None) if tail is not None else 0
+                message_keys.extend({"user_id": user_id, "session_id": message_key(session_id, index)}
+                                    for index in range(start_index, message_count))
+                item["chat_history"] = []
+                if tail is not None:
+                    item["message_count"], item["first_index"] = message_count, start_index
+            else:
+                chat_history = item.get("chat_history", [])
+                start_index = first_ranged_index(len(chat_history), tail, None) if tail is not None else 0
+                item["chat_history"] = chat_history[start_index:]
+                if tail is not None:
+                    item["message_count"], item["first_index"] = len(chat_history), start_index
+
+        message_items, unprocessed = batch_get_all(message_keys)
+        # a session whose messages could not all be read is reported as failed rather than returned partially
+        failed.update(owning_session_id(key["session_id"]) for key in unprocessed)
+        for message in sorted(message_items, key=lambda message: int(message["message_index"])):
+            session = sessions[owning_session_id(message["session_id"])]
+            session["chat_history"].append(message_entry(message, session.get("sources", [])))
+    except ClientError as error:
+        print("Caught error: DynamoDB error - could not get sessions")
+        return {
+            'statusCode': 500,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps(str(error))
+        }
+
+    for session in sessions.values():
+        session.pop("sources", None)
+    body = {
+        "sessions": {session_id: session for session_id, session in sessions.items() if session_id not in failed},
+        "missing": [session_id for session_id in session_ids if session_id not in sessions and session_id not in failed],
+        "failed": [session_id for session_id in session_ids if session_id in failed]
+    }
+    return {
+        'statusCode': 200,
+        'headers': {'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps(body, cls=DecimalEncoder)
+    }
+
+
 def update_session(session_id, user_id, new_chat_entry):
+    # appending no longer needs to read the session first, see append_turn
+    return append_turn(session_id, user_id, new_chat_entry)
+
+
+# Condition shared by both layouts when the caller passes the version it last read
+def version_condition(expected_version, values):
+    if expected_version == 0:
+        return "attribute_not_exists(session_id)"
+    values[":expected_version"] = expected_version
+    return "version = :expected_version"
+
+
+# Append to a session stored as one item with a single conditional UpdateItem, creating it if needed
+def append_item_turn(session_id, user_id, new_chat_entry, title, time_stamp, expected_version):
+    values = {
+        ":empty": [],
+        ":entry": [new_chat_entry],
+        ":title": title,
+        ":time_stamp": time_stamp,
+        ":one": 1
+    }
+    # never append a chat_history list to a session that uses the 'message' layout or is archived
+    condition = "attribute_not_exists(layout) AND attribute_not_exists(archived)"
+    if expected_version is not None:
+        condition += " AND " + version_condition(expected_version, values)
+    # ALL_NEW also returns summary_index, which the append does not touch
+    response = table.update_item(
+        Key={"session_id": session_id, "user_id": user_id},
+        UpdateExpression=("SET chat_history = list_append(if_not_exists(chat_history, :empty), :entry), "
+                          "title = if_not_exists(title, :title), time_stamp = if_not_exists(time_stamp, :time_stamp), "
+                          "last_active = :time_stamp ADD version :one"),
+        ConditionExpression=condition,
+        ExpressionAttributeValues=values,
+        ReturnValues="ALL_NEW"
+    )
+    attributes = response.get("Attributes", {})
+    return {"version": int(attributes.get("version", 0)), "message_count": len(attributes.get("chat_history", [])),
+            "summary_index": int(attributes.get("summary_index", 0))}
+
+
+# Append to a session stored in the 'message' layout. The header is read first for the index of the new
+# message, then the header update and the message item are written in one transaction, conditional on the
+# version that was read, so the message is written exactly when its index was handed out. Sources the
+# session has not cited before are appended to the header by the same update. A header that changed since it
+# was read is read again, unless the caller expects a version it no longer has.
+def append_message_turn(session_id, user_id, new_chat_entry, title, time_stamp, expected_version):
+    key = {"session_id": session_id, "user_id": user_id}
+    for attempt in range(APPEND_ATTEMPTS):
+        header = table.get_item(
+            Key=key,
+            ProjectionExpression="layout, archived, version, message_count, summary_index, sources"
+        ).get("Item", {})
+        version = int(header.get("version", 0))
+        # never turn a session that still keeps its chat_history on one item, or an archived one, into a header
+        if header and (header.get("layout") != "message" or "archived" in header):
+            break
+        if expected_version is not None and version != expected_version:
+            break
+        message_count = int(header.get("message_count", 0))
+        entry, new_sources = intern_sources(new_chat_entry, header.get("sources", []))
+        values = {
+            ":title": title,
+            ":time_stamp": time_stamp,
+            ":layout": "message",
+            ":one": 1
+        }
+        update_expression = ("SET title = if_not_exists(title, :title), time_stamp = if_not_exists(time_stamp, :time_stamp), "
+                             "last_active = :time_stamp, layout = :layout")
+        condition = "attribute_not_exists(chat_history) AND attribute_not_exists(archived) AND "
+        if header:
+            condition += "version = :version"
+            values[":version"] = version
+        else:
+            condition += "attribute_not_exists(session_id)"
+        if new_sources:
+            update_expression += ", sources = list_append(if_not_exists(sources, :no_sources), :new_sources)"
+            values.update({":no_sources": [], ":new_sources": new_sources})
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=[
+                {"Update": {
+                    "TableName": DDB_TABLE_NAME,
+                    "Key": key,
+                    "UpdateExpression": update_expression + " ADD version :one, message_count :one",
+                    "ConditionExpression": condition,
+                    "ExpressionAttributeValues": values
+                }},
+                {"Put": {"TableName": DDB_TABLE_NAME, "Item": message_item(user_id, session_id, message_count, entry)}}
+            ])
+        except ClientError as error:
+            # a failed condition or a conflicting transaction: another write got to the header first
+            reasons = [reason.get("Code") for reason in error.response.get("CancellationReasons", [])]
+            if error.response['Error']['Code'] != "TransactionCanceledException" or \
+                    not set(reasons) <= {"None", "ConditionalCheckFailed", "TransactionConflict"}:
+                raise
+            time.sleep(random.uniform(0, min(1.0, 0.02 * 2 ** attempt)))
+            continue
+        return {"version": version + 1, "message_count": message_count + 1,
+                "summary_index": int(header.get("summary_index", 0))}
+    # reported like the failed condition of a single write, so append_turn tries the other layout
+    raise ClientError({"Error": {"Code": "ConditionalCheckFailedException",
+                                 "Message": f"Session {session_id} cannot be appended to in the 'message' layout"}},
+                      "TransactWriteItems")
+
+
+# Append one chat turn, creating the session if it does not exist yet. The title and time_stamp are only
+# set on creation and every append bumps a version counter, so a caller that passes expected_version only
+# succeeds if nobody else appended since it last read the session.
+def append_turn(session_id, user_id, new_chat_entry, title=None, expected_version=None):
+    time_stamp = str(datetime.now())
+    title = (title or f"Chat on {time_stamp}").strip()
+    # new sessions use the configured layout, the other one only matches sessions created before a switch
+    if SESSION_STORAGE_LAYOUT == "message":
+        appenders = [append_message_turn, append_item_turn]
+    else:
+        appenders = [append_item_turn, append_message_turn]
     try:
-        # Fetch current session details
-        session_response = get_session(session_id, user_id)
-        if 'statusCode' in session_response and session_response['statusCode'] != 200:
-            return session_response  # Return the error from get_session if any
-
-        session_data = json.loads(session_response['body'])
-        
-        # Check if 'chat_history' exists in the session data
-        current_chat_history = session_data.get('chat_history', [])
-        
-        # Append the new chat entry to the existing chat history
-        updated_chat_history = current_chat_history + [new_chat_entry]
-        
-        # Update the item in DynamoDB
-        response = table.update_item(
-            Key={"session_id": session_id, "user_id": user_id},
-            UpdateExpression="set chat_history = :chat_history",
-            ExpressionAttributeValues={":chat_history": updated_chat_history},
-            ReturnValues="UPDATED_NEW"
-        )
+        # a second round only runs after an archived session was restored
+        for attempt in range(2):
+            for append in appenders:
+                try:
+                    result = append(session_id, user_id, new_chat_entry, title, time_stamp, expected_version)
+                except ClientError as error:
+                    if error.response['Error']['Code'] != "ConditionalCheckFailedException":
+                        raise
+                    continue
+                request_index_turn(session_id, user_id, new_chat_entry, result["message_count"] - 1)
+                # the caller refreshes the rolling summary in the background when this is set
+                unsummarized = result["message_count"] - SUMMARY_TAIL_TURNS - result.pop("summary_index")
+                result["summary_due"] = SESSION_SUMMARY_EVERY_TURNS > 0 and unsummarized >= SESSION_SUMMARY_EVERY_TURNS
+                return {
+                    'statusCode': 200,
+                    'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({"session_id": session_id, **result})
+                }
+            if attempt or not restore_archived_session(session_id, user_id):
+                break
+        # neither layout accepted the write, so the version condition did not hold
         return {
-            'statusCode': 200,
-            'headers': {'Access-Control-Allow-Origin': '*' },
-            'body': response.get("Attributes", {})
+            'statusCode': 409,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps(f"Session {session_id} was modified concurrently, reload it and retry")
         }
     except ClientError as error:
-        print("Caught error: DynamoDB error - could not update session")
-        # Return a structured error message and status code
-        error_code = error.response['Error']['Code']
-        if error_code == "ResourceNotFoundException":
+        print("Caught error: DynamoDB error - could not append chat turn")
+        return {
+            'statusCode': 500,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'error': str(error),
+            'body': 'Failed to append the chat turn due to a database error.'
+        }
+
+
+# Fold the messages that dropped out of the chat Lambda's verbatim tail since the last refresh into the
+# session's rolling summary. The chat Lambda invokes this asynchronously on the maintenance function
+# when append_turn reports summary_due. Concurrent refreshes are harmless: only one of them can move summary_index forward.
+def refresh_summary(session_id, user_id):
+    try:
+        item = table.get_item(Key={"session_id": session_id, "user_id": user_id}).get("Item")
+        if item is None:
+            return {'statusCode': 404, 'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps(f"No record found with session id: {session_id}")}
+        summary_index = int(item.get("summary_index", 0))
+        entries = []
+        # archived sessions are summarized again once they are restored and appended to
+        if "archived" in item:
+            end_index = summary_index
+        elif item.get("layout") == "message":
+            end_index = int(item.get("message_count", 0)) - SUMMARY_TAIL_TURNS
+            if end_index > summary_index:
+                entries = [entry for _, entry in query_messages(user_id, session_id, summary_index, end_index - 1,
+                                                                sources=item.get("sources", []))]
+        else:
+            chat_history = item.get("chat_history", [])
+            end_index = len(chat_history) - SUMMARY_TAIL_TURNS
+            entries = chat_history[summary_index:max(summary_index, end_index)]
+        if not entries:
+            return {'statusCode': 200, 'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({"session_id": session_id, "refreshed": False, "summary_index": summary_index})}
+
+        summary = session_summary.summarize(item.get("summary"), entries)
+        table.update_item(
+            Key={"session_id": session_id, "user_id": user_id},
+            UpdateExpression="SET summary = :summary, summary_index = :summary_index",
+            # the session must still exist, and the summary must not have moved on since it was read
+            ConditionExpression=("attribute_exists(session_id) AND attribute_not_exists(archived) AND "
+                                 "(attribute_not_exists(summary_index) OR summary_index = :previous_index)"),
+            ExpressionAttributeValues={":summary": summary, ":summary_index": end_index,
+                                       ":previous_index": summary_index}
+        )
+        return {'statusCode': 200, 'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({"session_id": session_id, "refreshed": True, "summary_index": end_index})}
+    except ClientError as error:
+        if error.response['Error']['Code'] == "ConditionalCheckFailedException":
+            return {'statusCode': 200, 'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({"session_id": session_id, "refreshed": False})}
+        print(f"Caught error: could not refresh session summary: {error}")
+        return {'statusCode': 500, 'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps(str(error))}
+
+
+# Page through a session's messages in either layout. Returns messages with their index and a page token
+# (the next index to read) while more messages remain in [start_index, end_index].
+def get_session_messages(session_id, user_id, start_index=0, end_index=None, page_size=50, page_token=None):
+    try:
+        start_index = int(page_token) if page_token else int(start_index or 0)
+        end_index = MAX_MESSAGE_INDEX if end_index is None else min(int(end_index), MAX_MESSAGE_INDEX)
+        page_size = max(1, min(int(page_size), 500))
+        header = table.get_item(
+            Key={"session_id": session_id, "user_id": user_id},
+            ProjectionExpression="layout, message_count, sources"
+        ).get("Item")
+        if header is None:
             return {
                 'statusCode': 404,
                 'headers': {'Access-Control-Allow-Origin': '*'},
-                'error': str(error),
-                'body': f"No record found with session id: {session_id}"
+                'body': json.dumps(f"No record found with session id: {session_id}")
             }
+        if header.get("layout") == "message":
+            # read one extra message to know whether another page follows
+            messages = query_messages(user_id, session_id, start_index, end_index, limit=page_size + 1,
+                                      sources=header.get("sources", []))
         else:
-            return {
-                'statusCode': 500,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'error': str(error),
-                'body': 'Failed to update the session due to a database error.'
-            }
-    except Exception as general_error:
-        print("Caught error: DynamoDB error - could not update session")
-        # Return a generic error response for unexpected errors
+            chat_history = load_session(session_id, user_id).get("chat_history", [])
+            messages = list(enumerate(chat_history))[start_index:end_index + 1][:page_size + 1]
+        body = {"messages": [{"index": index, **entry} for index, entry in messages[:page_size]]}
+        if len(messages) > page_size:
+            body["next_page_token"] = str(messages[page_size][0])
+        return {
+            'statusCode': 200,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps(body, cls=DecimalEncoder)
+        }
+    except (TypeError, ValueError):
+        return {
+            'statusCode': 400,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps("start_index, end_index, page_size and page_token must be integers")
+        }
+    except ClientError as error:
+        print("Caught error: DynamoDB error - could not get session messages")
         return {
             'statusCode': 500,
             'headers': {'Access-Control-Allow-Origin': '*'},
-            'error': str(general_error),
-            'body': 'An unexpected error occurred while updating the se.'
+            'body': json.dumps(str(error))
         }
 
 
-# function to update the conflict report for a given index of a user/session chathistory
+# Write a whole session in the 'message' layout: the message items first, then the header `item` in place of
+# whatever the session's item was, only if `condition` still holds for it.
+def put_message_session(item, chat_history, condition, values):
+    user_id, session_id = item["user_id"], item["session_id"]
+    sources = []
+    with table.batch_writer() as batch:
+        for index, entry in enumerate(chat_history):
+            entry, new_sources = intern_sources(entry, sources)
+            sources.extend(new_sources)
+            batch.put_item(Item=message_item(user_id, session_id, index, entry))
+    item = {key: value for key, value in item.items() if key not in ("chat_history", "sources")}
+    item.update({"layout": "message", "message_count": len(chat_history)})
+    if sources:
+        item["sources"] = sources
+    table.put_item(Item=item, ConditionExpression=condition, ExpressionAttributeValues=values)
+
+
+# Move a session that keeps its whole chat_history on one item to the 'message' layout. Message items are
+# written first, then the item is replaced by a header only if nobody appended in between, so the migration
+# can safely be re-run after a failure.
+def migrate_session(session_id, user_id):
+    try:
+        item = table.get_item(Key={"session_id": session_id, "user_id": user_id}).get("Item")
+        if item is None:
+            return {'statusCode': 404, 'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps(f"No record found with session id: {session_id}")}
+        # archived sessions are restored in the 'message' layout when they are next read
+        if item.get("layout") == "message" or "archived" in item:
+            return {'statusCode': 200, 'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({"session_id": session_id, "migrated": False})}
+
+        chat_history = item.pop("chat_history", [])
+        old_version = item.get("version")
+        item["version"] = (old_version or 0) + 1
+        if old_version is None:
+            put_message_session(item, chat_history, "attribute_not_exists(version) AND size(chat_history) = :count",
+                                {":count": len(chat_history)})
+        else:
+            put_message_session(item, chat_history, "version = :version", {":version": old_version})
+        return {'statusCode': 200, 'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({"session_id": session_id, "migrated": True, "message_count": len(chat_history)})}
+    except ClientError as error:
+        print("Caught error: DynamoDB error - could not migrate session")
+        if error.response['Error']['Code'] == "ConditionalCheckFailedException":
+            return {'statusCode': 409, 'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps(f"Session {session_id} changed during migration, retry")}
+        return {'statusCode': 500, 'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps(str(error))}
+
+
+# Run a per-session operation on every session of a user, a page at a time. Stops early when the invocation
+# is about to time out and returns the page token to resume from.
+def for_each_user_session(user_id, operation, context=None, page_token=None):
+    results = []
+    while True:
+        sessions, page_token = query_session_page(user_id, MAX_SESSION_PAGE_SIZE, page_token)
+        for session in sessions:
+            result = operation(session["session_id"], user_id)
+            results.append({"id": session["session_id"], "statusCode": result["statusCode"]})
+        if not page_token:
+            return {"results": results, "complete": True}
+        if context is not None and context.get_remaining_time_in_millis() < ARCHIVE_TIME_MARGIN_MS:
+            return {"results": results, "complete": False, "page_token": page_token}
+
+
+# Migrate every session of a user to the 'message' layout
+def migrate_user_sessions(user_id, context=None, page_token=None):
+    return for_each_user_session(user_id, migrate_session, context, page_token)
+
+
+# Bring an archived session back from S3 into the table, in the 'message' layout. Returns False when the
+# session is not archived (or its archive cannot be found), True once it has been restored, also by a
+# concurrent request.
+def restore_archived_session(session_id, user_id, tombstone=None):
+    if tombstone is None:
+        tombstone = table.get_item(Key={"session_id": session_id, "user_id": user_id}).get("Item")
+    if not tombstone or "archived" not in tombstone or not session_archive.SESSION_ARCHIVE_BUCKET:
+        return False
+    session = session_archive.read_archive(tombstone["archived"]).get(session_id)
+    if session is None:
+        print(f"Caught error: archived session {session_id} not found in {tombstone['archived']}")
+        return False
+    chat_history = session.pop("chat_history", [])
+    header = {**session, "user_id": user_id, "session_id": session_id, "version": int(tombstone["version"]) + 1}
+    try:
+        put_message_session(header, chat_history, "archived = :archived AND version = :version",
+                            {":archived": tombstone["archived"], ":version": tombstone["version"]})
+    except ClientError as error:
+        if error.response['Error']['Code'] != "ConditionalCheckFailedException":
+            raise
+        return True
+    try:
+        # the table holds the session again, do not keep a second copy
+        session_archive.remove_from_archive(tombstone["archived"], session_id)
+    except ClientError as error:
+        print(f"Caught error: S3 error - could not remove restored session from archive: {error}")
+    return True
+
+
+# Move the given sessions, all archived to the same S3 object, out of the table. Sessions that were active
+# since `cutoff` or changed while being archived stay in the table. Returns the number of sessions archived.
+def archive_sessions(key, candidates, cutoff):
+    items = []
+    for candidate in candidates:
+        item = load_session(candidate["session_id"], candidate["user_id"], restore=False)
+        if item and "archived" not in item and item.get("last_active", item.get("time_stamp", "")) < cutoff:
+            items.append(item)
+    if not items:
+        return 0
+
+    # conditional on the object's ETag, so a restore or delete of another session in the same object
+    # cannot overwrite these copies (or the other way round) before the tombstones below are written
+    copies = {item["session_id"]: json.loads(json.dumps(item, cls=DecimalEncoder)) for item in items}
+    session_archive.add_to_archive(key, copies)
+
+    archived = 0
+    for item in items:
+        tombstone = {
+            "user_id": item["user_id"],
+            "session_id": item["session_id"],
+            "title": item.get("title", ""),
+            "time_stamp": item["time_stamp"],
+            "version": int(item.get("version", 0)) + 1,
+            "archived": key
+        }
+        try:
+            if "version" in item:
+                table.put_item(Item=tombstone, ConditionExpression="version = :version",
+                               ExpressionAttributeValues={":version": item["version"]})
+            else:
+                table.put_item(Item=tombstone, ConditionExpression="attribute_not_exists(version) AND size(chat_history) = :count",
+                               ExpressionAttributeValues={":count": len(item.get("chat_history", []))})
+        except ClientError as error:
+            if error.response['Error']['Code'] != "ConditionalCheckFailedException":
+                raise
+            # appended to meanwhile, it stays in the table, so its copy is dropped again. Unless another run
+            # archived it first: its tombstone may point at the same copy, or that run replaced the copy.
+            current = table.get_item(Key={"user_id": item["user_id"], "session_id": item["session_id"]},
+                                     ProjectionExpression="archived").get("Item")
+            if current is not None and "archived" not in current:
+                session_archive.remove_from_archive(key, item["session_id"], copies[item["session_id"]])
+            continue
+        if item.get("layout") == "message":
+            delete_message_items(item["session_id"], item["user_id"])
+        archived += 1
+    return archived
+
+
+# Archive every session idle for more than SESSION_ARCHIVE_AFTER_DAYS. Candidates come from a scan of the
+# narrow SessionListIndex, grouped into one S3 object per user and month. Stops early when the invocation
+# is about to time out; the next run picks up the remaining sessions.
+def archive_idle_sessions(context=None):
+    cutoff = str(datetime.now() - timedelta(days=SESSION_ARCHIVE_AFTER_DAYS))
+    scan_kwargs = {
+        'IndexName': SESSION_LIST_INDEX,
+        'ProjectionExpression': 'user_id, session_id, time_stamp',
+        # time_stamp is the creation time, so this only narrows down the sessions whose last activity is checked
+        'FilterExpression': Attr('time_stamp').lt(cutoff) & Attr('archived').not_exists()
+    }
+    archived = 0
+    while True:
+        response = table.scan(**scan_kwargs)
+        groups = {}
+        for item in response.get("Items", []):
+            groups.setdefault(session_archive.archive_key(item["user_id"], item["time_stamp"]), []).append(item)
+        for key, candidates in groups.items():
+            archived += archive_sessions(key, candidates, cutoff)
+        if "LastEvaluatedKey" not in response:
+            return {"archived": archived, "complete": True}
+        if context is not None and context.get_remaining_time_in_millis() < ARCHIVE_TIME_MARGIN_MS:
+            return {"archived": archived, "complete": False}
+        scan_kwargs['ExclusiveStartKey'] = response["LastEvaluatedKey"]
+
+
+# Write the conflict report of message `index` of a session stored on one item, in place
+def set_item_conflict_report(session_id, user_id, index, conflict_report):
+    return table.update_item(
+        Key={"session_id": session_id, "user_id": user_id},
+        UpdateExpression=f"set chat_history[{index}].conflict_report = :conflict_report",
+        # the list must already hold the message, DynamoDB would otherwise append past its end
+        ConditionExpression="attribute_not_exists(layout) AND size(chat_history) > :index",
+        ExpressionAttributeValues={":conflict_report": conflict_report, ":index": index},
+        ReturnValues="UPDATED_NEW"
+    )
+
+
+# Write the conflict report of message `index` of a session stored in the 'message' layout
+def set_message_conflict_report(session_id, user_id, index, conflict_report):
+    return table.update_item(
+        Key={"session_id": message_key(session_id, index), "user_id": user_id},
+        UpdateExpression="set conflict_report = :conflict_report",
+        ConditionExpression="attribute_exists(entry)",
+        ExpressionAttributeValues={":conflict_report": conflict_report},
+        ReturnValues="UPDATED_NEW"
+    )
+
+
+# function to update the conflict report for a given index of a user/session chathistory.
+# A single conditional update of that one message, without reading the session first.
 def update_conflict_report(session_id, user_id, index, conflict_report):
     try:
-        # Fetch current session details
-        session_response = get_session(session_id, user_id)
-        if 'statusCode' in session_response and session_response['statusCode'] != 200:
-            return session_response  # Return the error from get_session if any
-
-        session_data = json.loads(session_response['body'])
-        
-        # Check if 'chat_history' exists in the session data
-        current_chat_history = session_data.get('chat_history', [])
-        
-        # Check if the index is valid
-        if index < 0 or index >= len(current_chat_history):
-            return {
-                'statusCode': 400,
-                'headers': {'Access-Control-Allow-Origin': '*'},
-                'body': 'Invalid index provided for conflict report update.'
-            }
-        
-        # Update the conflict report at the specified index
-        current_chat_history[index]['conflict_report'] = conflict_report
-        
-        # Update the item in DynamoDB
-        response = table.update_item(
-            Key={"session_id": session_id, "user_id": user_id},
-            UpdateExpression="set chat_history = :chat_history",
-            ExpressionAttributeValues={":chat_history": current_chat_history},
-            ReturnValues="UPDATED_NEW"
-        )
+        index = int(index)
+    except (TypeError, ValueError):
+        index = -1
+    if index < 0 or index > MAX_MESSAGE_INDEX:
         return {
-            'statusCode': 200,
+            'statusCode': 400,
             'headers': {'Access-Control-Allow-Origin': '*'},
-            'body': response.get("Attributes", {})
+            'body': 'Invalid index provided for conflict report update.'
+        }
+    # try the layout new sessions use first, like append_turn
+    if SESSION_STORAGE_LAYOUT == "message":
+        writers = [set_message_conflict_report, set_item_conflict_report]
+    else:
+        writers = [set_item_conflict_report, set_message_conflict_report]
+    try:
+        # a second round only runs after an archived session was restored
+        for attempt in range(2):
+            for write in writers:
+                try:
+                    response = write(session_id, user_id, index, conflict_report)
+                except ClientError as error:
+                    if error.response['Error']['Code'] != "ConditionalCheckFailedException":
+                        raise
+                    continue
+                return {
+                    'statusCode': 200,
+                    'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': response.get("Attributes", {})
+                }
+            if attempt or not restore_archived_session(session_id, user_id):
+                break
+        # neither layout has a message at this index
+        return {
+            'statusCode': 400,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': 'Invalid index provided for conflict report update.'
         }
     except ClientError as error:
         print("Caught error: DynamoDB error - could not update conflict report")
@@ -199,10 +889,34 @@ def update_conflict_report(session_id, user_id, index, conflict_report):
             'error': str(general_error),
         }
 
+# Delete the message items of a session in the 'message' layout
+def delete_message_items(session_id, user_id):
+    while True:
+        messages = table.query(
+            KeyConditionExpression=Key('user_id').eq(user_id) & Key('session_id').between(
+                message_key(session_id, 0), message_key(session_id, MAX_MESSAGE_INDEX)),
+            ProjectionExpression="session_id"
+        )
+        with table.batch_writer() as batch:
+            for item in messages.get("Items", []):
+                batch.delete_item(Key={"session_id": item["session_id"], "user_id": user_id})
+        if "LastEvaluatedKey" not in messages:
+            break
+
+
 def delete_session(session_id, user_id):
     try:
         # Attempt to delete an item from the DynamoDB table based on the provided session_id and user_id.
-        table.delete_item(Key={"session_id": session_id, "user_id": user_id})
+        response = table.delete_item(Key={"session_id": session_id, "user_id": user_id}, ReturnValues="ALL_OLD")
+        old_item = response.get("Attributes", {})
+        # An archived session also has a copy in its S3 archive object
+        if "archived" in old_item:
+            session_archive.remove_from_archive(old_item["archived"], session_id)
+        if old_item:
+            remove_from_index(session_id, user_id)
+        # A session in the 'message' layout also owns one item per message
+        if old_item.get("layout") == "message":
+            delete_message_items(session_id, user_id)
     except ClientError as error:
         print("Caught error: DynamoDB error - could not delete session")
         # Handle specific DynamoDB client errors. If the item cannot be found or another error occurs, return the appropriate message.
@@ -217,53 +931,327 @@ def delete_session(session_id, user_id):
 
 
 
+# The session an item belongs to: message items (session_id#000123) belong to their session header,
+# search index items to the session they index
+def owning_session_id(sort_key):
+    if sort_key.startswith(session_search.SEARCH_KEY_PREFIX):
+        return session_search.indexed_session_id(sort_key)
+    session_id, separator, index = sort_key.rpartition("#")
+    if separator and len(index) == MESSAGE_INDEX_DIGITS and index.isdigit():
+        return session_id
+    return sort_key
+
+
+# Exponential backoff with full jitter before retry `attempt` of a batch call
+def backoff(attempt):
+    time.sleep(random.uniform(0, min(2.0, 0.05 * 2 ** attempt)))
+
+
+# Send up to 25 put or delete requests with one BatchWriteItem, retrying unprocessed requests with
+# exponential backoff and full jitter. Returns the requests still unprocessed once the attempts run out.
+def batch_write(requests):
+    request_items = {DDB_TABLE_NAME: requests}
+    for attempt in range(BATCH_MAX_ATTEMPTS):
+        if attempt:
+            backoff(attempt)
+        try:
+            # the resource's client is thread-safe and takes plain Python values like the table does
+            response = dynamodb.meta.client.batch_write_item(RequestItems=request_items)
+        except ClientError as error:
+            # the whole batch was throttled, retry it as is
+            if error.response['Error']['Code'] in ("ProvisionedThroughputExceededException", "ThrottlingException"):
+                continue
+            raise
+        request_items = response.get("UnprocessedItems", {})
+        if not request_items:
+            return []
+    return request_items.get(DDB_TABLE_NAME, [])
+
+
+# Send any number of write requests, 25 per BatchWriteItem call, on BATCH_WORKERS threads
+def batch_write_all(requests):
+    batches = [requests[i:i + DELETE_BATCH_SIZE] for i in range(0, len(requests), DELETE_BATCH_SIZE)]
+    unprocessed = []
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+        for remaining in pool.map(batch_write, batches):
+            unprocessed.extend(remaining)
+    return unprocessed
+
+
+# Delete up to 25 items with one BatchWriteItem. Returns the keys that are still not deleted.
+def batch_delete_keys(keys):
+    remaining = batch_write([{"DeleteRequest": {"Key": key}} for key in keys])
+    return [request["DeleteRequest"]["Key"] for request in remaining]
+
+
+# Delete every session of a user, including the message items of sessions in the 'message' layout.
+# All of the user's keys are paged from the table, then deleted 25 at a time on BATCH_WORKERS threads.
+# The report lists every session and whether all of its items were deleted.
 def delete_user_sessions(user_id):
     try:
-        # Fetch all sessions associated with the given user_id. This function should return a list of session dictionaries.
-        sessions = list_sessions_by_user_id(user_id)
-        ret_value = []  # Initialize a list to hold the results of the deletion attempts.
+        keys_by_session = {}
+        query_kwargs = {
+            'KeyConditionExpression': Key('user_id').eq(user_id),
+            'ProjectionExpression': 'session_id'
+        }
+        while True:
+            response = table.query(**query_kwargs)
+            for item in response.get("Items", []):
+                keys_by_session.setdefault(owning_session_id(item["session_id"]), []).append(
+                    {"user_id": user_id, "session_id": item["session_id"]})
+            if "LastEvaluatedKey" not in response:
+                break
+            query_kwargs['ExclusiveStartKey'] = response["LastEvaluatedKey"]
+    except ClientError as error:
+        print("Caught error: DynamoDB error - could not list sessions to delete")
+        return {'statusCode': 500, 'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps(f"Error occurred: {error}")}
 
-        # Iterate through each session fetched from the database.
-        for session in sessions:
-            # Attempt to delete each session and capture the result.
-            result = delete_session(session["SessionId"], user_id)
-            # Append the result of the deletion attempt to the ret_value list. 
-            # This includes the session ID and whether the deletion was successful.
-            ret_value.append({"id": session["SessionId"], "deleted": result["deleted"]})
+    keys = [key for session_keys in keys_by_session.values() for key in session_keys]
+    batches = [keys[i:i + DELETE_BATCH_SIZE] for i in range(0, len(keys), DELETE_BATCH_SIZE)]
+    failed_sessions = set()
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+        futures = [(batch, pool.submit(batch_delete_keys, batch)) for batch in batches]
+        for batch, future in futures:
+            try:
+                remaining = future.result()
+            except ClientError as error:
+                print(f"Caught error: DynamoDB error - could not delete a batch of sessions: {error}")
+                remaining = batch
+            failed_sessions.update(owning_session_id(key["session_id"]) for key in remaining)
 
-        # Return a list of dictionaries, each containing the session ID and deletion result.
-        return ret_value
+    if session_archive.SESSION_ARCHIVE_BUCKET:
+        try:
+            session_archive.delete_user_archives(user_id)
+        except ClientError as error:
+            print(f"Caught error: S3 error - could not delete archived sessions: {error}")
+            failed_sessions.update(keys_by_session)
 
-    except Exception as error:
-        # Handle any unexpected errors that might occur during the process.
-        # Return a list containing a single dictionary with an error message.
-        return [{"error": str(error)}]
-        
-        
-def list_sessions_by_user_id(user_id, limit = 15):
-    items = []  # Initialize an empty list to store the fetched session items
+    report = [{"id": session_id, "deleted": session_id not in failed_sessions} for session_id in keys_by_session]
+    return {
+        'statusCode': 200 if not failed_sessions else 207,
+        'headers': {'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps(report)
+    }
 
+
+# Have the maintenance function index an appended turn, so the index writes of index_turn stay off the
+# request path. Only the text that gets indexed is sent. Best effort: a turn that is not indexed is still
+# picked up by a later index_session.
+def request_index_turn(session_id, user_id, entry, message_index):
+    if not SESSION_MAINTENANCE_FUNCTION:
+        print("SESSION_MAINTENANCE_FUNCTION is not set, chat turn not indexed")
+        return
     try:
-        last_evaluated_key = None  # Initialize the key to control the pagination loop
-
-        # Keep fetching until we have 15 items or there are no more items to fetch
-        while len(items) < limit:
-            response = table.query(
-                IndexName='TimeIndex',  # Specify the secondary index to perform the query
-                ProjectionExpression='session_id, title, time_stamp',  # Limit the fields returned in the results
-                KeyConditionExpression="user_id = :user_id",  # Define the key condition for the query
-                ExpressionAttributeValues={":user_id": user_id},  # Bind the user_id value to the placeholder in KeyConditionExpression
-                ScanIndexForward=False,  # Sort the results in descending order by the sort key
-                Limit=limit - len(items),  # Dynamically adjust the query limit based on how many items we've already retrieved
-            )
-            items.extend(response.get("Items", []))  # Extend the items list with the newly fetched items
-
-            last_evaluated_key = response.get("LastEvaluatedKey")  # Update the pagination key
-            if not last_evaluated_key:  # Break the loop if there are no more items to fetch
-                break
+        lambda_client.invoke(
+            FunctionName=SESSION_MAINTENANCE_FUNCTION,
+            InvocationType="Event",
+            Payload=json.dumps({
+                "operation": "index_turn",
+                "user_id": user_id,
+                "session_id": session_id,
+                "message_index": message_index,
+                "entry": {field: entry.get(field) for field in ("user", "chatbot")}
+            })
+        )
+    except ClientError as error:
+        print(f"Caught error: could not start indexing the chat turn: {error}")
 
+
+# Add one chat turn to the session search index (see session_search): a single item with the turn's term
+# counts. Runs in the maintenance function, see request_index_turn. Indexing is best effort, the turn stays
+# appended if it fails.
+def index_turn(session_id, user_id, entry, message_index):
+    items = turn_index_items(session_id, user_id, message_index, entry)
+    if not items:
+        return
+    try:
+        remaining = batch_write_all([{"PutRequest": {"Item": item}} for item in items])
+        if remaining:
+            print(f"Caught error: DynamoDB error - could not index chat turn {message_index} of session {session_id}")
     except ClientError as error:
-        print("Caught error: DynamoDB error - could not list user sessions")
+        print(f"Caught error: DynamoDB error - could not index chat turn: {error}")
+
+
+# Index items of one message of a session
+def turn_index_items(session_id, user_id, message_index, entry):
+    return [{"user_id": user_id, "session_id": session_search.turn_key(session_id, message_index, chunk), "tf": terms}
+            for chunk, terms in enumerate(session_search.term_chunks(session_search.entry_terms(entry)))]
+
+
+# Index items describing a whole chat history, as the appends of its turns would have left them
+def session_index_items(session_id, user_id, chat_history):
+    return [item for index, entry in enumerate(chat_history)
+            for item in turn_index_items(session_id, user_id, index, entry)]
+
+
+# (Re)build the search index of a session from its history, for sessions created before search existed.
+# Every index item is overwritten, so this can be re-run, also while turns are appended.
+def index_session(session_id, user_id):
+    try:
+        item = load_session(session_id, user_id, restore=False)
+        if item is None:
+            return {'statusCode': 404, 'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps(f"No record found with session id: {session_id}")}
+        # archived sessions were indexed before they were archived, their index stays in the table
+        if "archived" in item:
+            return {'statusCode': 200, 'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({"session_id": session_id, "indexed": False})}
+        items = session_index_items(session_id, user_id, item.get("chat_history", []))
+        remaining = batch_write_all([{"PutRequest": {"Item": index_item}} for index_item in items])
+        if remaining:
+            return {'statusCode': 503, 'headers': {'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps(f"Session {session_id} was only partly indexed, retry")}
+        return {'statusCode': 200, 'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({"session_id": session_id, "indexed": True, "terms": len({term for index_item in items for term in index_item["tf"]})})}
+    except ClientError as error:
+        print("Caught error: DynamoDB error - could not index session")
+        return {'statusCode': 500, 'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps(str(error))}
+
+
+# Index every session of a user
+def index_user_sessions(user_id, context=None, page_token=None):
+    return for_each_user_session(user_id, index_session, context, page_token)
+
+
+# Remove a deleted session from the search index
+def remove_from_index(session_id, user_id):
+    items = query_index_items(user_id, session_search.session_prefix(session_id))
+    remaining = batch_write_all([{"DeleteRequest": {"Key": {"user_id": user_id, "session_id": item["session_id"]}}}
+                                 for item in items])
+    # leftover index items are harmless, search skips sessions that no longer exist
+    if remaining:
+        print(f"Caught error: DynamoDB error - could not delete {len(remaining)} search index items of session {session_id}")
+
+
+# All index items of a user whose sort key starts with prefix
+def query_index_items(user_id, prefix):
+    items = []
+    query_kwargs = {
+        'TableName': DDB_TABLE_NAME,
+        'KeyConditionExpression': "user_id = :user_id AND begins_with(session_id, :prefix)",
+        'ExpressionAttributeValues': {":user_id": user_id, ":prefix": prefix}
+    }
+    while True:
+        response = dynamodb.meta.client.query(**query_kwargs)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return items
+        query_kwargs['ExclusiveStartKey'] = response["LastEvaluatedKey"]
+
+
+# Session attributes search results are built from, without the chat history of single-item sessions
+SEARCH_HEADER_PROJECTION = {
+    "ProjectionExpression": "#session_id, #title, #time_stamp, #layout, #archived",
+    "ExpressionAttributeNames": {f"#{name}": name for name in ("session_id", "title", "time_stamp", "layout", "archived")}
+}
+
+
+# The one chat_history entry of a session stored on a single item that a snippet is taken from
+def get_item_entry(session_id, user_id, index):
+    item = dynamodb.meta.client.get_item(
+        TableName=DDB_TABLE_NAME,
+        Key={"user_id": user_id, "session_id": session_id},
+        ProjectionExpression=f"chat_history[{int(index)}]"
+    ).get("Item")
+    return (item or {}).get("chat_history", [None])[0]
+
+
+# Find a user's sessions by content. The user's search index is inverted for the query's terms and sessions
+# ranked with BM25; each result carries a snippet of the last message that contains the query's rarest
+# term, read as a single message item (or a single chat_history element) rather than the whole history.
+def search_sessions(user_id, query, limit=10):
+    if not isinstance(query, str) or not query.strip():
+        return {'statusCode': 400, 'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps("query must be a non-empty string")}
+    try:
+        limit = max(1, min(int(limit), MAX_SEARCH_RESULTS))
+    except (TypeError, ValueError):
+        return {'statusCode': 400, 'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps("limit must be an integer")}
+    terms = session_search.query_terms(query)
+    try:
+        index_items = query_index_items(user_id, session_search.TURN_KEY_PREFIX) if terms else []
+        postings, lengths, message_indices = session_search.invert(index_items, terms)
+        scores = session_search.bm25_scores(postings, lengths)
+        hits = heapq.nlargest(limit, scores.items(), key=lambda hit: hit[1])
+
+        # snippets come from the last message holding the rarest query term the session contains
+        snippet_indices = {}
+        for hit_id, _ in hits:
+            rarest = min((term for term in terms if hit_id in postings[term]), key=lambda term: len(postings[term]))
+            snippet_indices[hit_id] = message_indices[(rarest, hit_id)]
+        headers, _ = batch_get_all([{"user_id": user_id, "session_id": hit_id} for hit_id, _ in hits], SEARCH_HEADER_PROJECTION)
+        headers = {header["session_id"]: header for header in headers}
+        # archived sessions keep their messages in S3 and are not restored just for a snippet
+        live_ids = [hit_id for hit_id, _ in hits if hit_id in headers and "archived" not in headers[hit_id]]
+        message_ids = [hit_id for hit_id in live_ids if headers[hit_id].get("layout") == "message"]
+        item_ids = [hit_id for hit_id in live_ids if headers[hit_id].get("layout") != "message"]
+        messages, _ = batch_get_all([{"user_id": user_id, "session_id": message_key(hit_id, snippet_indices[hit_id])}
+                                     for hit_id in message_ids])
+        entries = {owning_session_id(message["session_id"]): decode_entry(message["entry"]) for message in messages}
+        if item_ids:
+            with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+                item_entries = pool.map(lambda hit_id: get_item_entry(hit_id, user_id, snippet_indices[hit_id]), item_ids)
+                entries.update(zip(item_ids, item_entries))
+    except ClientError as error:
+        print("Caught error: DynamoDB error - could not search sessions")
+        return {'statusCode': 500, 'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps(str(error))}
+
+    results = []
+    for hit_id, score in hits:
+        header = headers.get(hit_id)
+        # postings can outlive a session that was deleted while search ran
+        if header is None:
+            continue
+        index = snippet_indices[hit_id]
+        entry = entries.get(hit_id)
+        results.append({
+            "session_id": hit_id,
+            "title": header.get("title"),
+            "time_stamp": header.get("time_stamp"),
+            "score": round(score, 4),
+            "message_index": index,
+            "snippet": session_search.snippet(session_search.entry_text(entry), set(terms)) if entry else None
+        })
+    return {'statusCode': 200, 'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({"Items": results}, cls=DecimalEncoder)}
+
+
+# Page tokens wrap the index's LastEvaluatedKey so clients treat them as opaque strings
+def encode_page_token(last_evaluated_key):
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, cls=DecimalEncoder).encode("utf-8")).decode("utf-8")
+
+
+def decode_page_token(page_token):
+    return json.loads(base64.urlsafe_b64decode(page_token.encode("utf-8")))
+
+
+# Read one page of a user's sessions, newest first. A single Query per page, whichever page it is.
+# Returns the sessions and the token of the next page (None after the last page).
+def query_session_page(user_id, page_size, page_token=None):
+    query_kwargs = {
+        'IndexName': SESSION_LIST_INDEX,
+        'KeyConditionExpression': Key('user_id').eq(user_id),
+        'ProjectionExpression': 'session_id, title, time_stamp',
+        'ScanIndexForward': False,  # the index is sorted by time_stamp, newest first
+        'Limit': page_size
+    }
+    if page_token:
+        query_kwargs['ExclusiveStartKey'] = decode_page_token(page_token)
+    response = table.query(**query_kwargs)
+    sessions = [{"time_stamp": item["time_stamp"], "session_id": item["session_id"], "title": item["title"].strip()}
+                for item in response.get("Items", [])]
+    last_evaluated_key = response.get("LastEvaluatedKey")
+    return sessions, encode_page_token(last_evaluated_key) if last_evaluated_key else None
+
+
+# Map errors from listing sessions to a response
+def list_sessions_error(user_id, error):
+    print("Caught error: DynamoDB error - could not list user sessions")
+    if isinstance(error, ClientError):
         # More detailed client error handling based on DynamoDB error codes
         error_code = error.response['Error']['Code']
         if error_code == "ResourceNotFoundException":
@@ -285,24 +1273,54 @@ def list_sessions_by_user_id(user_id, limit = 15):
             'headers': {
             'Access-Control-Allow-Origin': '*'  # CORS header allowing access from any domain
         }, 'body': "Internal server error"}
-    except KeyError as key_error:
-        print("Caught error: DynamoDB error - could not list user sessions")
+    if isinstance(error, KeyError):
         # Handle errors that might occur if expected keys are missing in the response
         return {'statusCode': 500,
         'headers': {
             'Access-Control-Allow-Origin': '*'  # CORS header allowing access from any domain
-        }, 'body': f"Key error: {str(key_error)}"}
-    except Exception as general_error:
-        print("Caught error: DynamoDB error - could not list user sessions")
-        # Generic error handling for any other unforeseen errors
-        return {'statusCode': 500,
-        'headers': {
-            'Access-Control-Allow-Origin': '*'  # CORS header allowing access from any domain
-        }, 'body': json.dumps(f"An unexpected error occurred: {str(general_error)}")}
+        }, 'body': f"Key error: {str(error)}"}
+    # Generic error handling for any other unforeseen errors
+    return {'statusCode': 500,
+    'headers': {
+        'Access-Control-Allow-Origin': '*'  # CORS header allowing access from any domain
+    }, 'body': json.dumps(f"An unexpected error occurred: {str(error)}")}
+
+
+# Cursor-paginated listing: returns one page of page_size sessions, newest first, and the token of the next page
+def list_sessions(user_id, page_size=15, page_token=None):
+    try:
+        page_size = max(1, min(int(page_size), MAX_SESSION_PAGE_SIZE))
+        sessions, next_page_token = query_session_page(user_id, page_size, page_token)
+    except (TypeError, ValueError):
+        # a malformed page_size or a page token that does not decode
+        return {'statusCode': 400,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': "Invalid input parameters"}
+    except Exception as error:
+        return list_sessions_error(user_id, error)
 
-    # Sort the items by 'time_stamp' in descending order to ensure the latest sessions appear first
-    sorted_items = sorted(items, key=lambda x: x['time_stamp'], reverse=True)
-    sorted_items = list(map(lambda x: {"time_stamp" : x["time_stamp"], "session_id" : x["session_id"], "title" : x["title"].strip()},sorted_items))
+    return {
+        'statusCode': 200,
+        'headers': {'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({'Items': sessions, 'NextPageToken': next_page_token})
+    }
+
+
+# Returns the user's latest `limit` sessions as a plain list, or all of them when limit is None
+def list_sessions_by_user_id(user_id, limit = 15):
+    items = []  # Initialize an empty list to store the fetched session items
+
+    try:
+        page_token = None
+        # Follow the page tokens until we have `limit` items or there are no more items to fetch
+        while limit is None or len(items) < limit:
+            page_size = MAX_SESSION_PAGE_SIZE if limit is None else min(limit - len(items), MAX_SESSION_PAGE_SIZE)
+            sessions, page_token = query_session_page(user_id, page_size, page_token)
+            items.extend(sessions)
+            if not page_token:  # Break the loop if there are no more items to fetch
+                break
+    except Exception as error:
+        return list_sessions_error(user_id, error)
 
     # Prepare the HTTP response object with a status code, headers, and body
     response = {
@@ -310,13 +1328,11 @@ def list_sessions_by_user_id(user_id, limit = 15):
         'headers': {
             'Access-Control-Allow-Origin': '*'  # CORS header allowing access from any domain
         },
-        'body': json.dumps(sorted_items)  # Convert the sorted list of items to JSON format for the response body
+        'body': json.dumps(items)  # Items already come newest first from the index
     }
     return response  # Return the response object
 
 
-
-
 def lambda_handler(event, context):
     data = json.loads(event['body'])
     operation = data.get('operation')
@@ -327,25 +1343,36 @@ def lambda_handler(event, context):
     title = data.get('title', f"Chat on {str(datetime.now())}")
     confl_report = data.get('conflict_report', None)
     idx = data.get('message_index', None)
-    if operation != 'list_sessions_by_user_id':
+    if operation not in ('list_sessions_by_user_id', 'list_sessions'):
         print(operation)
 
     if operation == 'add_session':
         return add_session(session_id, user_id, chat_history, title, new_chat_entry)
     elif operation == 'get_session':
-        return get_session(session_id, user_id)
+        return get_session(session_id, user_id, data.get('tail'), data.get('since_index'))
+    elif operation == 'get_sessions':
+        return get_sessions(data.get('session_ids'), user_id, data.get('tail'))
     elif operation == 'update_session':
         return update_session(session_id, user_id, new_chat_entry)
+    elif operation == 'append_turn':
+        return append_turn(session_id, user_id, new_chat_entry, data.get('title'), data.get('expected_version'))
+    elif operation == 'get_session_messages':
+        return get_session_messages(session_id, user_id, data.get('start_index', 0), data.get('end_index'),
+                                    data.get('page_size', 50), data.get('page_token'))
+    elif operation == 'list_sessions':
+        return list_sessions(user_id, data.get('page_size', 15), data.get('page_token'))
     elif operation == 'list_sessions_by_user_id':
         return list_sessions_by_user_id(user_id)
     elif operation == 'list_all_sessions_by_user_id':
-        return list_sessions_by_user_id(user_id,limit=100)
+        return list_sessions_by_user_id(user_id, limit=None)
     elif operation == 'delete_session':
         return delete_session(session_id, user_id)
     elif operation == 'delete_user_sessions':
         return delete_user_sessions(user_id)
     elif operation == 'update_conflict_report':
         return update_conflict_report(session_id, user_id, idx, confl_report)
+    elif operation == 'search_sessions':
+        return search_sessions(user_id, data.get('query'), data.get('limit', 10))
     else:
         response = {
             'statusCode': 400,
@@ -354,4 +1381,40 @@ def lambda_handler(event, context):
             },
             'body': json.dumps(f'Operation not found/allowed! Operation Sent: {operation}')
         }
-        return response
\ No newline at end of file
+        return response
+
+
+# Entry point of the scheduled archival job, deployed as its own function
+def archive_handler(event, context):
+    if not session_archive.SESSION_ARCHIVE_BUCKET:
+        print("SESSION_ARCHIVE_BUCKET is not set, nothing to do")
+        return {"archived": 0, "complete": True}
+    result = archive_idle_sessions(context)
+    print(f"Archived {result['archived']} idle sessions, complete: {result['complete']}")
+    return result
+
+
+# Entry point of the internal maintenance function. It is not behind the API: the session and chat functions
+# invoke it to index appended turns and refresh summaries, operators invoke it directly for migrations and
+# index backfills. The user-wide
+# operations return complete: False and a page_token when they ran out of time; invoke again with that token.
+def maintenance_handler(event, context):
+    operation = event.get('operation')
+    user_id = event.get('user_id')
+    session_id = event.get('session_id')
+    print(operation)
+
+    if operation == 'refresh_summary':
+        return refresh_summary(session_id, user_id)
+    elif operation == 'index_turn':
+        return index_turn(session_id, user_id, event.get('entry', {}), event.get('message_index'))
+    elif operation == 'migrate_session':
+        return migrate_session(session_id, user_id)
+    elif operation == 'migrate_user_sessions':
+        return migrate_user_sessions(user_id, context, event.get('page_token'))
+    elif operation == 'index_session':
+        return index_session(session_id, user_id)
+    elif operation == 'index_user_sessions':
+        return index_user_sessions(user_id, context, event.get('page_token'))
+    print(f"Caught error: unknown maintenance operation {operation}")
+    return {"error": f"Operation not found: {operation}"}
@@ -0,0 +1,116 @@
+# Cold storage for idle chat sessions.
+#
+# Archived sessions live in SESSION_ARCHIVE_BUCKET, one gzip-compressed JSON object per user and month
+# (sessions/<user_id>/<YYYY-MM>.json.gz) mapping session_id to the full session as get_session returns it.
+# The table keeps a small tombstone per archived session that names its object in `archived`.
+# Several writers can change the same object (the archive job, restores and deletes), so every change is a
+# read-modify-write made conditional on the ETag that was read, retried from a fresh read when it loses a race.
+import gzip
+import json
+import os
+import random
+import time
+from decimal import Decimal
+
+import boto3
+from botocore.exceptions import ClientError
+from history_codec import json_default
+
+SESSION_ARCHIVE_BUCKET = os.environ.get("SESSION_ARCHIVE_BUCKET")
+# Read-modify-write rounds before a change to an archive object gives up
+ARCHIVE_WRITE_ATTEMPTS = 8
+
+s3 = boto3.client("s3", region_name='us-east-1')
+
+
+def archive_prefix(user_id):
+    return f"sessions/{user_id}/"
+
+
+# Sessions are grouped by the month they were created in, time_stamp starts with YYYY-MM
+def archive_key(user_id, time_stamp):
+    return f"{archive_prefix(user_id)}{time_stamp[:7]}.json.gz"
+
+
+# Sessions stored in an archive object, keyed by session_id ({} if the object does not exist)
+def read_archive(key):
+    return read_archive_version(key)[0]
+
+
+# Sessions stored in an archive object and the object's ETag (None if the object does not exist)
+def read_archive_version(key):
+    try:
+        response = s3.get_object(Bucket=SESSION_ARCHIVE_BUCKET, Key=key)
+    except ClientError as error:
+        if error.response['Error']['Code'] in ("NoSuchKey", "404"):
+            return {}, None
+        raise
+    # DynamoDB takes Decimal rather than float, keep restored numbers writable
+    return json.loads(gzip.decompress(response["Body"].read()).decode("utf-8"), parse_float=Decimal), response["ETag"]
+
+
+# Replace the archive object read with ETag `etag` (None: the object did not exist). Raises a ClientError
+# with code PreconditionFailed if someone else wrote or deleted the object since.
+def write_archive(key, sessions, etag):
+    if not sessions:
+        if etag is not None:
+            s3.delete_object(Bucket=SESSION_ARCHIVE_BUCKET, Key=key, IfMatch=etag)
+        return
+    condition = {"IfMatch": etag} if etag is not None else {"IfNoneMatch": "*"}
+    s3.put_object(
+        Bucket=SESSION_ARCHIVE_BUCKET,
+        Key=key,
+        Body=gzip.compress(json.dumps(sessions, separators=(",", ":"), default=json_default).encode("utf-8")),
+        ContentType="application/json",
+        ContentEncoding="gzip",
+        **condition
+    )
+
+
+# Apply `change` to the sessions of an archive object and write them back, starting over from a fresh read
+# whenever another writer got there first. change(sessions) edits the dict in place and returns
+# (result, changed); nothing is written when changed is false. Returns the result of the round that was written.
+def update_archive(key, change):
+    for attempt in range(ARCHIVE_WRITE_ATTEMPTS):
+        sessions, etag = read_archive_version(key)
+        result, changed = change(sessions)
+        if not changed:
+            return result
+        try:
+            write_archive(key, sessions, etag)
+            return result
+        except ClientError as error:
+            # PreconditionFailed: the ETag no longer matches, ConditionalRequestConflict: a concurrent
+            # conditional write to the same key is in flight
+            if error.response['Error']['Code'] not in ("PreconditionFailed", "ConditionalRequestConflict", "412", "409"):
+                raise
+            time.sleep(random.uniform(0, min(1.0, 0.05 * 2 ** attempt)))
+    raise RuntimeError(f"Archive object {key} kept changing, gave up after {ARCHIVE_WRITE_ATTEMPTS} attempts")
+
+
+# Add sessions (keyed by session_id) to an archive object, replacing earlier copies
+def add_to_archive(key, new_sessions):
+    def add(sessions):
+        sessions.update(new_sessions)
+        return None, True
+    update_archive(key, add)
+
+
+# Drop a session from its archive object, returning the archived session (None if it was not there). With
+# `copy`, the session is only dropped while the archived session is still exactly that copy.
+def remove_from_archive(key, session_id, copy=None):
+    def remove(sessions):
+        if copy is not None and sessions.get(session_id) != copy:
+            return None, False
+        session = sessions.pop(session_id, None)
+        return session, session is not None
+    return update_archive(key, remove)
+
+
+# Delete every archive object of a user
+def delete_user_archives(user_id):
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=SESSION_ARCHIVE_BUCKET, Prefix=archive_prefix(user_id)):
+        keys = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+        if keys:
+            s3.delete_objects(Bucket=SESSION_ARCHIVE_BUCKET, Delete={"Objects": keys, "Quiet": True})
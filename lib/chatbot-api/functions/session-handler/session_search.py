@@ -0,0 +1,129 @@
+# Full-text search over a user's chat sessions.
+#
+# The index lives in the session table, in the user's own partition, next to the sessions it covers:
+#   search#turn#<session_id>#<message_index>#<chunk>   `tf`: map of term -> times it occurs in the message
+# Indexing a turn is one write of one item, whatever the number of terms; only a message with more than
+# MAX_TERMS_PER_ITEM distinct terms takes a second chunk. Writing a message's item again overwrites it, so a
+# retried or repeated indexing never counts a turn twice. Search reads the user's turn items (terms and
+# counts only, far smaller than the histories) and inverts them into term -> session postings in memory.
+# The items carry no time_stamp and therefore never show up in the session list indexes.
+# This module holds the tokenizer, key layout, inversion and BM25 ranking; reads and writes are in lambda_function.
+import math
+import re
+from collections import Counter
+
+SEARCH_KEY_PREFIX = "search#"
+TURN_KEY_PREFIX = "search#turn#"
+
+# Distinct terms per index item, keeps items far below DynamoDB's 400 KB limit
+MAX_TERMS_PER_ITEM = 2000
+
+# Terms longer than this are ids, hashes or URLs rather than words someone would search for
+MAX_TERM_LENGTH = 40
+# Only the first terms of a query are used
+MAX_QUERY_TERMS = 10
+# Characters of message text around the first match
+SNIPPET_LENGTH = 200
+
+# BM25 parameters, the usual defaults
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+STOPWORDS = frozenset((
+    "a about above after again all also am an and any are as at be because been before being below between "
+    "both but by can could did do does doing down during each few for from further had has have having he her "
+    "here hers him his how i if in into is it its itself just me more most my no nor not now of off on once "
+    "only or other our ours out over own same she should so some such than that the their theirs them then "
+    "there these they this those through to too under until up very was we were what when where which while "
+    "who whom why will with would you your yours"
+).split())
+
+
+def turn_key(session_id, message_index, chunk):
+    return f"{TURN_KEY_PREFIX}{session_id}#{message_index}#{chunk}"
+
+
+def session_prefix(session_id):
+    return f"{TURN_KEY_PREFIX}{session_id}#"
+
+
+# The session and message an index item describes
+def indexed_session_id(sort_key):
+    return sort_key[len(TURN_KEY_PREFIX):].split("#")[0]
+
+
+def indexed_message_index(sort_key):
+    return int(sort_key.split("#")[-2])
+
+
+# The term counts of a message split over as many index items as needed
+def term_chunks(terms):
+    ordered = sorted(terms.items())
+    return [dict(ordered[i:i + MAX_TERMS_PER_ITEM]) for i in range(0, len(ordered), MAX_TERMS_PER_ITEM)]
+
+
+# Invert turn index items into what bm25_scores and the snippets need: postings (term -> {session_id: tf})
+# for the query terms, lengths (session_id -> number of terms) for every indexed session, and for each term
+# and session the last message the term occurs in.
+def invert(items, terms):
+    postings = {term: {} for term in terms}
+    lengths = {}
+    message_indices = {}
+    for item in items:
+        session_id = indexed_session_id(item["session_id"])
+        message_index = indexed_message_index(item["session_id"])
+        counts = item.get("tf", {})
+        lengths[session_id] = lengths.get(session_id, 0) + sum(int(tf) for tf in counts.values())
+        for term in terms:
+            if term in counts:
+                postings[term][session_id] = postings[term].get(session_id, 0) + int(counts[term])
+                message_indices[(term, session_id)] = max(message_index, message_indices.get((term, session_id), -1))
+    return postings, lengths, message_indices
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower())
+            if len(token) <= MAX_TERM_LENGTH and token not in STOPWORDS]
+
+
+# Searchable text of a chat entry: the question and the answer, not the source metadata
+def entry_text(entry):
+    return "\n".join(str(entry.get(field) or "") for field in ("user", "chatbot"))
+
+
+def entry_terms(entry):
+    return Counter(tokenize(entry_text(entry)))
+
+
+def query_terms(query):
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+# BM25 score of every session that contains at least one query term.
+# postings maps term -> {session_id: tf}, lengths maps session_id -> number of terms for all indexed sessions.
+def bm25_scores(postings, lengths):
+    if not lengths:
+        return {}
+    session_count = len(lengths)
+    average_length = sum(lengths.values()) / session_count or 1
+    scores = {}
+    for sessions in postings.values():
+        idf = math.log(1 + (session_count - len(sessions) + 0.5) / (len(sessions) + 0.5))
+        for session_id, tf in sessions.items():
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[session_id] / average_length)
+            scores[session_id] = scores.get(session_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+    return scores
+
+
+# A window of the text around the first occurrence of any of the terms
+def snippet(text, terms):
+    position = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.group().lower() in terms:
+            position = match.start()
+            break
+    start = max(0, position - SNIPPET_LENGTH // 4)
+    end = min(len(text), start + SNIPPET_LENGTH)
+    return ("…" if start else "") + " ".join(text[start:end].split()) + ("…" if end < len(text) else "")
@@ -0,0 +1,53 @@
+# Rolling summaries of long chat sessions.
+#
+# A session's `summary` condenses its messages before `summary_index`. The chat Lambda sends the summary
+# and the messages from summary_index on to the model instead of the whole history. refresh_summary in
+# lambda_function folds newer messages into the summary with a small model every few turns.
+import json
+import os
+
+import boto3
+
+SUMMARY_MODEL_ID = os.environ.get("SUMMARY_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0")
+# Upper bound on the summary itself, it is sent with every prompt of the session
+SUMMARY_MAX_TOKENS = 400
+# Characters of each question and answer given to the summarizer, so one long answer cannot crowd out the rest
+SUMMARY_MESSAGE_CHARS = 4000
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a conversation between a user and an assistant that answers questions "
+    "from a knowledge base. Update the summary with the new exchanges. Keep what the user is trying to "
+    "accomplish, the facts, names, numbers and documents the answers relied on, and any open questions. "
+    "Drop greetings and repetition. Write at most 250 words of plain prose and reply with the summary only."
+)
+
+bedrock = boto3.client("bedrock-runtime", region_name='us-east-1')
+
+
+def clip(text):
+    text = str(text or "")
+    return text if len(text) <= SUMMARY_MESSAGE_CHARS else text[:SUMMARY_MESSAGE_CHARS] + "…"
+
+
+def summary_prompt(previous_summary, entries):
+    exchanges = "\n\n".join(f"User: {clip(entry.get('user'))}\nAssistant: {clip(entry.get('chatbot'))}"
+                            for entry in entries)
+    return (f"<summary>\n{previous_summary or 'No summary yet.'}\n</summary>\n\n"
+            f"<new_exchanges>\n{exchanges}\n</new_exchanges>")
+
+
+# The previous summary updated with the given chat entries
+def summarize(previous_summary, entries):
+    response = bedrock.invoke_model(
+        modelId=SUMMARY_MODEL_ID,
+        contentType="application/json",
+        body=json.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "system": SUMMARY_INSTRUCTIONS,
+            "max_tokens": SUMMARY_MAX_TOKENS,
+            "temperature": 0,
+            "messages": [{"role": "user", "content": [{"type": "text", "text": summary_prompt(previous_summary, entries)}]}]
+        })
+    )
+    body = json.loads(response["body"].read())
+    return "".join(block.get("text", "") for block in body.get("content", [])).strip()
@@ -13,6 +13,11 @@ import { S3Client, GetObjectCommand } from '@aws-sdk/client-s3';
 const ENDPOINT = process.env.WEBSOCKET_API_ENDPOINT;
 const CONFL_PROMPT = process.env.CONFL_PROMPT;
 const wsConnectionClient = new ApiGatewayManagementApiClient({ endpoint: ENDPOINT });
+// the model sees the session's rolling summary plus the newest turns it does not cover yet,
+// at most CONTEXT_TAIL_TURNS of them, shortened to CONTEXT_CHAR_BUDGET characters in total
+const CONTEXT_TAIL_TURNS = 10;
+const CONTEXT_CHAR_BUDGET = 16000;
+const TRUNCATION_MARKER = " [...]";
 
 // function to get system prompt from the system prompt handler lambda invocation
 async function getSystemPrompt() {
@@ -35,6 +40,62 @@ async function getSystemPrompt() {
   }
 }
 
+// Cut both sides of a turn to the same share of their length, marking where text was left out
+function truncateTurn(turn, ratio) {
+  const shorten = (text) => {
+    const keep = Math.floor(text.length * ratio);
+    return keep + TRUNCATION_MARKER.length < text.length ? text.slice(0, keep) + TRUNCATION_MARKER : text;
+  };
+  return { ...turn, user: shorten(turn.user ?? ""), chatbot: shorten(turn.chatbot ?? "") };
+}
+
+// Load the session's rolling summary and the turns it does not cover. Nothing outside the summary is
+// left out: over the character budget every turn is shortened by the same ratio instead.
+// Falls back to the last two turns the client sent if the session cannot be read.
+async function getConversationContext(userId, sessionId, chatHistory) {
+  const fallback = { summary: null, turns: chatHistory.slice(-2) };
+  if (chatHistory.length === 0) {
+    return fallback;
+  }
+  try {
+    const client = new LambdaClient({});
+    const command = new InvokeCommand({
+      FunctionName: process.env.SESSION_HANDLER,
+      Payload: JSON.stringify({
+        body: JSON.stringify({
+          "operation": "get_session",
+          "user_id": userId,
+          "session_id": sessionId,
+          "tail": CONTEXT_TAIL_TURNS
+        })
+      }),
+    });
+    const { Payload } = await client.send(command);
+    const response = JSON.parse(Buffer.from(Payload).toString());
+    if (response.statusCode !== 200) {
+      throw new Error(response.body);
+    }
+    const session = JSON.parse(response.body);
+    if (!session.chat_history) {
+      return fallback;
+    }
+    // chat_history[0] is message first_index, messages before summary_index are in the summary already
+    const firstIndex = session.first_index ?? 0;
+    const summaryIndex = session.summary_index ?? 0;
+    let turns = session.chat_history.filter((_, i) => firstIndex + i >= summaryIndex);
+    const size = turns.reduce((total, turn) => total + (turn.user ?? "").length + (turn.chatbot ?? "").length, 0);
+    if (size > CONTEXT_CHAR_BUDGET) {
+      // leave room for the markers, two per turn
+      const ratio = Math.max(0, CONTEXT_CHAR_BUDGET - 2 * turns.length * TRUNCATION_MARKER.length) / size;
+      turns = turns.map((turn) => truncateTurn(turn, ratio));
+    }
+    return { summary: session.summary ?? null, turns: turns };
+  } catch (error) {
+    console.error("Caught error: could not load session context:", error);
+    return fallback;
+  }
+}
+
 /* Use the Bedrock Knowledge Base*/
 async function retrieveKBDocs(query, knowledgeBase, knowledgeBaseID) {
   const input = { // RetrieveRequest
@@ -132,7 +193,8 @@ const generateConflictReport = async (connectionId, requestJSON) => {
         body: JSON.stringify({
             "operation": "get_session",
             "user_id": userId,
-            "session_id": sessionId
+            "session_id": sessionId,
+            "since_index": messageIndex
         })
       };
       // invoke the session handler lambda
@@ -160,11 +222,13 @@ const generateConflictReport = async (connectionId, requestJSON) => {
             return; // Optional: Stop further execution in case of JSON parsing errors
         }
         console.log('Output:', output);
+        // only the messages from messageIndex on were loaded, chat_history[0] is message first_index
         let userChatHistory = output.chat_history;
+        const historyIndex = messageIndex - (output.first_index ?? 0);
       console.log("message index", messageIndex);
-      console.log("chat history", userChatHistory[messageIndex]);
+      console.log("chat history", userChatHistory[historyIndex]);
   
-      const chatEntry = userChatHistory[messageIndex];
+      const chatEntry = userChatHistory[historyIndex];
       if (!chatEntry) {
         throw new Error('Chat entry not found.');
       }
@@ -268,22 +332,23 @@ const getUserResponse = async (id, requestJSON) => {
       throw new Error("Knowledge Base ID is not found.");
     }        
 
-    // retrieve a model response based on the last 5 messages
-    // messages come paired, so that's why the slice is only 2 (2 x 2 + the latest prompt = 5)
+    // retrieve a model response based on the session's rolling summary and its newest turns
     let claude = new ClaudeModel();
-    let lastFiveMessages = chatHistory.slice(-2);
+    const context = await getConversationContext(userId, sessionId, chatHistory);
     
     let stopLoop = false;        
     let modelResponse = ''
     
-    let history = claude.assembleHistory(lastFiveMessages, "Please use your search tool one or more times based on this latest prompt: ".concat(userMessage))    
+    let history = claude.assembleHistory(context.turns, "Please use your search tool one or more times based on this latest prompt: ".concat(userMessage))    
     let fullDocs = []; // Collect all documents for conflict detection 
     
-    const SYS_PROMPT = await getSystemPrompt(); 
+    let SYS_PROMPT = await getSystemPrompt();
+    if (context.summary) {
+      SYS_PROMPT = `${SYS_PROMPT ?? ''}\n\nSummary of the earlier conversation in this session:\n${context.summary}`;
+    }
     
     while (!stopLoop) {
       console.log("started new stream")
-      // console.log(lastFiveMessages)
       // console.log(history)
       history.forEach((historyItem) => {
         console.log(historyItem)
@@ -416,50 +481,10 @@ const getUserResponse = async (id, requestJSON) => {
     //}
 
 
-    const sessionRequest = {
-      body: JSON.stringify({
-        "operation": "get_session",
-        "user_id": userId,
-        "session_id": sessionId
-      })
-    }
-    const client = new LambdaClient({});
-    const lambdaCommand = new InvokeCommand({
-      FunctionName: process.env.SESSION_HANDLER,
-      Payload: JSON.stringify(sessionRequest),
-    });
-
-    const { Payload, LogResult } = await client.send(lambdaCommand);
-    const result = Buffer.from(Payload).toString();
-
-    // Check if the request was successful
-    if (!result) {
-      throw new Error("Error retriving session data!");
-    }
-
-    // Parse the JSON
-    let output = {};
-    try {
-      const response = JSON.parse(result);
-      output = JSON.parse(response.body);
-      console.log('Parsed JSON:', output);
-    } catch (error) {
-      await sendData(id, "<!ERROR!>: Unable to load past messages, please retry your query");
-      console.error('Failed to parse JSON:', error);
-
-      return; // Optional: Stop further execution in case of JSON parsing errors
-    }
-
-    // Continue processing the data
-    const retrievedHistory = output.chat_history;
-    let operation = '';
-    let title = ''; // Ensure 'title' is initialized if used later in your code
-
-    // Further logic goes here
-
+    // a session is new when the client has no history for it yet, only then is a title generated
+    let title = '';
     let newChatEntry = { "user": userMessage, "chatbot": modelResponse, "metadata": sourcesJson, "conflictReport": null };
-    if (retrievedHistory === undefined) {
-        operation = 'add_session';
+    if (chatHistory.length === 0) {
         let titleModel = new Mistral7BModel();
         const CONTEXT_COMPLETION_INSTRUCTIONS =
           `<s>[INST]Generate a concise title for this chat session based on the initial user prompt and response. The title should succinctly capture the essence of the chat's main topic without adding extra content.[/INST]
@@ -468,13 +493,13 @@ const getUserResponse = async (id, requestJSON) => {
         Here's your session title:`;
         title = await titleModel.getPromptedResponse(CONTEXT_COMPLETION_INSTRUCTIONS, 25);
         title = title.replaceAll(`"`, '');
-    } else {
-      operation = 'update_session';
     }
 
+    // append_turn creates the session if needed and appends the turn in a single write,
+    // the title is only kept if this call is the one that creates the session
     const sessionSaveRequest = {
       body: JSON.stringify({
-        "operation": operation,
+        "operation": "append_turn",
         "user_id": userId,
         "session_id": sessionId,
         "new_chat_entry": newChatEntry,
@@ -482,13 +507,32 @@ const getUserResponse = async (id, requestJSON) => {
       })
     }
 
+    const client = new LambdaClient({});
     const lambdaSaveCommand = new InvokeCommand({
       FunctionName: process.env.SESSION_HANDLER,
       Payload: JSON.stringify(sessionSaveRequest),
     });
 
-    // const { SessionSavePayload, SessionSaveLogResult } = 
-    await client.send(lambdaSaveCommand);
+    const { Payload } = await client.send(lambdaSaveCommand);
+    const saveResult = JSON.parse(Buffer.from(Payload).toString());
+    if (saveResult.statusCode !== 200) {
+      console.error("Caught error: could not save chat turn:", saveResult.body);
+    } else if (JSON.parse(saveResult.body).summary_due) {
+      // fold older turns into the session's rolling summary without holding up this response
+      try {
+        await client.send(new InvokeCommand({
+          FunctionName: process.env.SESSION_MAINTENANCE_FUNCTION,
+          InvocationType: "Event",
+          Payload: JSON.stringify({
+            "operation": "refresh_summary",
+            "user_id": userId,
+            "session_id": sessionId
+          }),
+        }));
+      } catch (error) {
+        console.error("Caught error: could not start summary refresh:", error);
+      }
+    }
 
     const input = {
       ConnectionId: id,
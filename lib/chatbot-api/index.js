@@ -34,6 +34,7 @@ class ChatBotApi extends constructs_1.Construct {
             wsApiEndpoint: websocketBackend.wsAPIStage.url,
             sessionTable: tables.historyTable,
             feedbackTable: tables.feedbackTable,
+            feedbackStatsTable: tables.feedbackStatsTable,
             feedbackBucket: buckets.feedbackBucket,
             knowledgeBucket: buckets.knowledgeBucket,
             knowledgeBase: knowledgeBase.knowledgeBase,
@@ -41,6 +42,7 @@ class ChatBotApi extends constructs_1.Construct {
             evalSummariesTable: tables.evalSummaryTable,
             evalResutlsTable: tables.evalResultsTable,
             evalTestCasesBucket: buckets.evalTestCasesBucket,
+            sessionArchiveBucket: buckets.sessionArchiveBucket,
             stagedSystemPromptsTable: tables.stagedSystemPromptsTable,
             activeSystemPromptsTable: tables.activeSystemPromptsTable,
         });
@@ -94,6 +96,20 @@ class ChatBotApi extends constructs_1.Construct {
             integration: feedbackAPIDownloadIntegration,
             authorizer: httpAuthorizer,
         });
+        const feedbackAPIStatsIntegration = new aws_apigatewayv2_integrations_2.HttpLambdaIntegration('FeedbackStatsAPIIntegration', lambdaFunctions.feedbackFunction);
+        restBackend.restAPI.addRoutes({
+            path: "/user-feedback/stats",
+            methods: [aws_cdk_lib_1.aws_apigatewayv2.HttpMethod.GET],
+            integration: feedbackAPIStatsIntegration,
+            authorizer: httpAuthorizer,
+        });
+        const feedbackAPIItemIntegration = new aws_apigatewayv2_integrations_2.HttpLambdaIntegration('FeedbackItemAPIIntegration', lambdaFunctions.feedbackFunction);
+        restBackend.restAPI.addRoutes({
+            path: "/user-feedback/item",
+            methods: [aws_cdk_lib_1.aws_apigatewayv2.HttpMethod.GET],
+            integration: feedbackAPIItemIntegration,
+            authorizer: httpAuthorizer,
+        });
         const s3GetKnowledgeAPIIntegration = new aws_apigatewayv2_integrations_2.HttpLambdaIntegration('S3GetKnowledgeAPIIntegration', lambdaFunctions.getS3KnowledgeFunction);
         restBackend.restAPI.addRoutes({
             path: "/s3-knowledge-bucket-data",
@@ -51,6 +51,7 @@ export class ChatBotApi extends Construct {
         wsApiEndpoint: websocketBackend.wsAPIStage.url,
         sessionTable: tables.historyTable,        
         feedbackTable: tables.feedbackTable,
+        feedbackStatsTable: tables.feedbackStatsTable,
         feedbackBucket: buckets.feedbackBucket,
         knowledgeBucket: buckets.knowledgeBucket,
         knowledgeBase: knowledgeBase.knowledgeBase,
@@ -58,6 +59,7 @@ export class ChatBotApi extends Construct {
         evalSummariesTable : tables.evalSummaryTable,
         evalResutlsTable : tables.evalResultsTable,
         evalTestCasesBucket : buckets.evalTestCasesBucket,
+        sessionArchiveBucket : buckets.sessionArchiveBucket,
         stagedSystemPromptsTable : tables.stagedSystemPromptsTable,
         activeSystemPromptsTable : tables.activeSystemPromptsTable,
       })
@@ -123,6 +125,22 @@ export class ChatBotApi extends Construct {
       authorizer: httpAuthorizer,
     })
 
+    const feedbackAPIStatsIntegration = new HttpLambdaIntegration('FeedbackStatsAPIIntegration', lambdaFunctions.feedbackFunction);
+    restBackend.restAPI.addRoutes({
+      path: "/user-feedback/stats",
+      methods: [apigwv2.HttpMethod.GET],
+      integration: feedbackAPIStatsIntegration,
+      authorizer: httpAuthorizer,
+    })
+
+    const feedbackAPIItemIntegration = new HttpLambdaIntegration('FeedbackItemAPIIntegration', lambdaFunctions.feedbackFunction);
+    restBackend.restAPI.addRoutes({
+      path: "/user-feedback/item",
+      methods: [apigwv2.HttpMethod.GET],
+      integration: feedbackAPIItemIntegration,
+      authorizer: httpAuthorizer,
+    })
+
     const s3GetKnowledgeAPIIntegration = new HttpLambdaIntegration('S3GetKnowledgeAPIIntegration', lambdaFunctions.getS3KnowledgeFunction);
     restBackend.restAPI.addRoutes({
       path: "/s3-knowledge-bucket-data",
@@ -4,6 +4,7 @@ import { Table } from 'aws-cdk-lib/aws-dynamodb';
 export declare class TableStack extends Stack {
     readonly historyTable: Table;
     readonly feedbackTable: Table;
+    readonly feedbackStatsTable: Table;
     readonly evalResultsTable: Table;
     readonly evalSummaryTable: Table;
     readonly activeSystemPromptsTable: Table;
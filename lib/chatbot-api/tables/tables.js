@@ -18,6 +18,16 @@ class TableStack extends aws_cdk_lib_1.Stack {
             sortKey: { name: 'time_stamp', type: aws_dynamodb_1.AttributeType.STRING },
             projectionType: aws_dynamodb_1.ProjectionType.ALL,
         });
+        // Narrow index for listing sessions: keys, time_stamp, title and the archive marker only, so paging
+        // through a user's sessions never reads their chat history. TimeIndex can be dropped once this index
+        // is live (CloudFormation creates or deletes one GSI per table update).
+        chatHistoryTable.addGlobalSecondaryIndex({
+            indexName: 'SessionListIndex',
+            partitionKey: { name: 'user_id', type: aws_dynamodb_1.AttributeType.STRING },
+            sortKey: { name: 'time_stamp', type: aws_dynamodb_1.AttributeType.STRING },
+            projectionType: aws_dynamodb_1.ProjectionType.INCLUDE,
+            nonKeyAttributes: ['title', 'archived'],
+        });
         this.historyTable = chatHistoryTable;
         // Define the second table (UserFeedbackTable)
         const userFeedbackTable = new aws_dynamodb_1.Table(scope, 'UserFeedbackTable', {
@@ -36,7 +46,31 @@ class TableStack extends aws_cdk_lib_1.Stack {
             sortKey: { name: 'CreatedAt', type: aws_dynamodb_1.AttributeType.STRING },
             projectionType: aws_dynamodb_1.ProjectionType.ALL,
         });
+        // Narrow copy of AnyIndex for the admin feedback list: keys and the attributes the list shows only,
+        // without the prompts, chatbot answers and their sources (see LIST_COLUMNS in the feedback handler)
+        userFeedbackTable.addGlobalSecondaryIndex({
+            indexName: 'AnyListIndex',
+            partitionKey: { name: 'Any', type: aws_dynamodb_1.AttributeType.STRING },
+            sortKey: { name: 'CreatedAt', type: aws_dynamodb_1.AttributeType.STRING },
+            projectionType: aws_dynamodb_1.ProjectionType.INCLUDE,
+            nonKeyAttributes: ['FeedbackID', 'Problem', 'Feedback', 'UserPromptPreview', 'SessionID'],
+        });
+        // The same narrow projection for listing the feedback of one topic, keyed like the table itself
+        userFeedbackTable.addGlobalSecondaryIndex({
+            indexName: 'TopicListIndex',
+            partitionKey: { name: 'Topic', type: aws_dynamodb_1.AttributeType.STRING },
+            sortKey: { name: 'CreatedAt', type: aws_dynamodb_1.AttributeType.STRING },
+            projectionType: aws_dynamodb_1.ProjectionType.INCLUDE,
+            nonKeyAttributes: ['FeedbackID', 'Any', 'Problem', 'Feedback', 'UserPromptPreview', 'SessionID'],
+        });
         this.feedbackTable = userFeedbackTable;
+        // Feedback counters kept up to date by the feedback handler, one item per shard, day and topic, problem or day
+        // total, so dashboards read a few rows per day instead of every feedback item
+        const feedbackStatsTable = new aws_dynamodb_1.Table(scope, 'FeedbackStatsTable', {
+            partitionKey: { name: 'Metric', type: aws_dynamodb_1.AttributeType.STRING },
+            sortKey: { name: 'Bucket', type: aws_dynamodb_1.AttributeType.STRING },
+        });
+        this.feedbackStatsTable = feedbackStatsTable;
         const evalSummariesTable = new aws_dynamodb_1.Table(scope, 'EvaluationSummariesTable', {
             partitionKey: { name: 'PartitionKey', type: aws_dynamodb_1.AttributeType.STRING },
             sortKey: { name: 'Timestamp', type: aws_dynamodb_1.AttributeType.STRING },
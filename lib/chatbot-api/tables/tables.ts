@@ -5,6 +5,7 @@ import { Attribute, AttributeType, Table, ProjectionType } from 'aws-cdk-lib/aws
 export class TableStack extends Stack {
   public readonly historyTable : Table;
   public readonly feedbackTable : Table;
+  public readonly feedbackStatsTable : Table;
   public readonly evalResultsTable : Table;
   public readonly evalSummaryTable : Table;
   public readonly activeSystemPromptsTable : Table;
@@ -26,6 +27,17 @@ export class TableStack extends Stack {
       projectionType: ProjectionType.ALL,
     });
 
+    // Narrow index for listing sessions: keys, time_stamp, title and the archive marker only, so paging
+    // through a user's sessions never reads their chat history. TimeIndex can be dropped once this index
+    // is live (CloudFormation creates or deletes one GSI per table update).
+    chatHistoryTable.addGlobalSecondaryIndex({
+      indexName: 'SessionListIndex',
+      partitionKey: { name: 'user_id', type: AttributeType.STRING },
+      sortKey: { name: 'time_stamp', type: AttributeType.STRING },
+      projectionType: ProjectionType.INCLUDE,
+      nonKeyAttributes: ['title', 'archived'],
+    });
+
     this.historyTable = chatHistoryTable;
 
     // Define the second table (UserFeedbackTable)
@@ -47,7 +59,34 @@ export class TableStack extends Stack {
       sortKey: { name: 'CreatedAt', type: AttributeType.STRING },
       projectionType: ProjectionType.ALL,
     });
+
+    // Narrow copy of AnyIndex for the admin feedback list: keys and the attributes the list shows only,
+    // without the prompts, chatbot answers and their sources (see LIST_COLUMNS in the feedback handler)
+    userFeedbackTable.addGlobalSecondaryIndex({
+      indexName: 'AnyListIndex',
+      partitionKey: { name: 'Any', type: AttributeType.STRING },
+      sortKey: { name: 'CreatedAt', type: AttributeType.STRING },
+      projectionType: ProjectionType.INCLUDE,
+      nonKeyAttributes: ['FeedbackID', 'Problem', 'Feedback', 'UserPromptPreview', 'SessionID'],
+    });
+
+    // The same narrow projection for listing the feedback of one topic, keyed like the table itself
+    userFeedbackTable.addGlobalSecondaryIndex({
+      indexName: 'TopicListIndex',
+      partitionKey: { name: 'Topic', type: AttributeType.STRING },
+      sortKey: { name: 'CreatedAt', type: AttributeType.STRING },
+      projectionType: ProjectionType.INCLUDE,
+      nonKeyAttributes: ['FeedbackID', 'Any', 'Problem', 'Feedback', 'UserPromptPreview', 'SessionID'],
+    });
     this.feedbackTable = userFeedbackTable; 
+
+    // Feedback counters kept up to date by the feedback handler, one item per shard, day and topic, problem or day
+    // total, so dashboards read a few rows per day instead of every feedback item
+    const feedbackStatsTable = new Table(scope, 'FeedbackStatsTable', {
+      partitionKey: { name: 'Metric', type: AttributeType.STRING },
+      sortKey: { name: 'Bucket', type: AttributeType.STRING },
+    });
+    this.feedbackStatsTable = feedbackStatsTable;
     
     const evalSummariesTable = new Table(scope, 'EvaluationSummariesTable', {
       partitionKey: { name: 'PartitionKey', type: AttributeType.STRING },
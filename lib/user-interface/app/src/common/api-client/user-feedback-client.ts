@@ -1,6 +1,10 @@
 import { Utils } from "../utils"
 import { AppConfig } from "../types";
 
+/** Export jobs run in a Lambda function with a 15 minute timeout, a job still not done a minute later is not coming back */
+const EXPORT_POLL_TIMEOUT_MS = 16 * 60 * 1000;
+const EXPORT_POLL_INTERVAL_MS = 2000;
+
 export class UserFeedbackClient {
 
 
@@ -33,19 +37,24 @@ export class UserFeedbackClient {
   async downloadFeedback(topic: string, startTime?: string, endTime?: string) {
     const auth = await Utils.authenticate();
 
-    /** This fetch call will get a presigned URL for downloading from S3 */
-    const response = await fetch(this.API + '/user-feedback/download-feedback', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        'Authorization': auth
-      },
-      body: JSON.stringify({ topic, startTime, endTime })
-    });
-    const result = await response.json();
+    /** The export runs as a background job, so large date ranges do not hit the API timeout.
+     * Identical recent requests get the same job back, and finished jobs come with a presigned URL.
+     */
+    let job = await this.requestFeedbackExport(auth, { topic, startTime, endTime, async: true });
+    const deadline = Date.now() + EXPORT_POLL_TIMEOUT_MS;
+    while (job.status === "queued" || job.status === "running") {
+      if (Date.now() >= deadline) {
+        throw new Error(`Feedback export timed out: job ${job.jobId} is still ${job.status}`);
+      }
+      await Utils.delay(EXPORT_POLL_INTERVAL_MS);
+      job = await this.requestFeedbackExport(auth, { jobId: job.jobId });
+    }
+    if (job.status !== "complete") {
+      throw new Error(`Feedback export failed: ${job.error ?? job.status}`);
+    }
 
     /** Now that we have the presigned URL, we can initiate a download */
-    fetch(result.download_url, {
+    fetch(job.download_url, {
       method: 'GET',
       headers: {
         'Content-Disposition': 'attachment',
@@ -64,10 +73,24 @@ export class UserFeedbackClient {
 
   }
 
-  async getUserFeedback(topic: string, startTime?: string, endTime?: string, nextPageToken?: string) {
+  /** Starts a feedback export job, or polls one when the body has a jobId */
+  private async requestFeedbackExport(auth: string, body: object) {
+    const response = await fetch(this.API + '/user-feedback/download-feedback', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': auth
+      },
+      body: JSON.stringify(body)
+    });
+    return await response.json();
+  }
+
+  /** Lists feedback with only the fields the admin table shows, use getFeedbackItem for the rest of an item */
+  async getUserFeedback(topic: string, startTime?: string, endTime?: string, nextPageToken?: string, pageSize?: number) {
 
     const auth = await Utils.authenticate();
-    let params = new URLSearchParams({ topic, startTime, endTime, nextPageToken });
+    let params = new URLSearchParams({ topic, startTime, endTime, nextPageToken, view: "list", pageSize: String(pageSize) });
 
     /** If the parameters are undefined, we don't want those being passed to the API, so 
      * this will delete any undefined parameters if needed. Admittedly, the API should handle this
@@ -94,6 +117,34 @@ export class UserFeedbackClient {
     return result;
   }
 
+  /** Fetches one whole feedback item, including the chatbot message and its sources */
+  async getFeedbackItem(topic: string, createdAt: string) {
+    const auth = await Utils.authenticate();
+    let params = new URLSearchParams({ topic, createdAt });
+    const response = await fetch(this.API + '/user-feedback/item?' + params.toString(), {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': auth,
+      },
+    });
+    return await response.json();
+  }
+
+  /** Positive and negative feedback counts per day, topic and problem between two dates (both included) */
+  async getFeedbackStats(startTime: string, endTime: string) {
+    const auth = await Utils.authenticate();
+    let params = new URLSearchParams({ startTime, endTime });
+    const response = await fetch(this.API + '/user-feedback/stats?' + params.toString(), {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': auth,
+      },
+    });
+    return await response.json();
+  }
+
   async deleteFeedback(topic: string, createdAt: string) {
     const auth = await Utils.authenticate();
     let params = new URLSearchParams({ topic, createdAt });
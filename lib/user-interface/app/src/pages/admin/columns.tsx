@@ -58,15 +58,17 @@ const FEEDBACK_COLUMN_DEFINITIONS = [
   {
     id: "createdAt",
     header: "Submission date",
+    // CreatedAt can end in "#<FeedbackID>" to keep keys unique, the date is the part before it
     cell: (item) =>
-      DateTime.fromISO(new Date(item.CreatedAt).toISOString()).toLocaleString(
+      DateTime.fromISO(new Date(item.CreatedAt.split("#")[0]).toISOString()).toLocaleString(
         DateTime.DATETIME_SHORT
       ),
   },
   {
     id: "prompt",
     header: "User Prompt",
-    cell: (item) => item.UserPrompt,
+    // the list has the start of the prompt only, the whole prompt is in the feedback panel
+    cell: (item) => item.UserPromptPreview ?? item.UserPrompt,
     isRowHeader: true
   },
 
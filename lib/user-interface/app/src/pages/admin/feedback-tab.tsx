@@ -35,6 +35,8 @@ export default function FeedbackTab(props: FeedbackTabProps) {
   const [selectedItems, setSelectedItems] = useState<any[]>([]);
   const [showModalDelete, setShowModalDelete] = useState(false);
   const needsRefresh = useRef<boolean>(false);
+  /** FeedbackID of the current selection, so a full item that arrives after the selection changed is dropped */
+  const selectedFeedbackId = useRef<string | undefined>(undefined);
 
   const [
     selectedOption,
@@ -115,6 +117,7 @@ export default function FeedbackTab(props: FeedbackTabProps) {
   useEffect(() => {
     setCurrentPageIndex(1);
     setSelectedItems([]);
+    selectedFeedbackId.current = undefined;
     if (needsRefresh.current) {
       // console.log("needs refresh!")
       getFeedback({ pageIndex: 1 });
@@ -165,6 +168,7 @@ export default function FeedbackTab(props: FeedbackTabProps) {
     );
     await getFeedback({ pageIndex: currentPageIndex });
     setSelectedItems([])
+    selectedFeedbackId.current = undefined;
     setLoading(false);
   };
 
@@ -204,11 +208,24 @@ export default function FeedbackTab(props: FeedbackTabProps) {
           loadingText={`Loading Feedback`}
           columnDefinitions={columnDefinitions}
           selectionType="single"
-          onSelectionChange={({ detail }) => {
+          onSelectionChange={async ({ detail }) => {
             // console.log(detail);
             // needsRefresh.current = true;
-            props.updateSelectedFeedback(detail.selectedItems[0])
+            const selected = detail.selectedItems[0];
+            props.updateSelectedFeedback(selected)
             setSelectedItems(detail.selectedItems);
+            selectedFeedbackId.current = selected?.FeedbackID;
+            /** The list only has summary fields, so fetch the whole item for the feedback panel */
+            if (selected) {
+              try {
+                const item = await apiClient.userFeedback.getFeedbackItem(selected.Topic, selected.CreatedAt);
+                if (selectedFeedbackId.current === selected.FeedbackID) {
+                  props.updateSelectedFeedback(item);
+                }
+              } catch (error) {
+                console.error(Utils.getErrorMessage(error));
+              }
+            }
           }}
           selectedItems={selectedItems}
           items={pages[Math.min(pages.length - 1, currentPageIndex - 1)]?.Items!}
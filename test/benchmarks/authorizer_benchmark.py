@@ -0,0 +1,196 @@
+# Throughput benchmark for the WebSocket authorizer (lib/authorization/websocket-api-authorizer).
+#
+# Everything runs locally: RSA key pairs and Cognito-shaped ID tokens are generated here and the
+# JWKS is served from an in-process HTTP stub that the authorizer reaches through JWKS_URL.
+# For each token mix (valid, expired, wrong audience, unknown kid) it reports cold-call latency
+# (fresh interpreter: import + first call), warm-call latency (same token again) and
+# verifications per second (a distinct token per call, so every call verifies a signature).
+# The decision for every call is checked, so the run also fails if a bad token is allowed.
+#
+#   python test/benchmarks/authorizer_benchmark.py [--calls 500] [--cold-runs 5] [--bits 2048]
+import argparse
+import base64
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AUTHORIZER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'lib', 'authorization', 'websocket-api-authorizer'))
+sys.path.insert(0, AUTHORIZER_DIR)
+
+import rsa  # noqa: E402  (vendored in the authorizer bundle)
+
+USER_POOL_ID = 'us-east-1_Benchmark'
+APP_CLIENT_ID = 'benchmark-app-client'
+METHOD_ARN = 'arn:aws:execute-api:us-east-1:123456789012:abcdef1234/prod/$connect'
+MIXES = ['valid', 'expired', 'wrong_audience', 'unknown_kid']
+# the benchmark measures token validation, so per-user connect rate limiting is switched off
+BENCHMARK_ENV = {'USER_POOL_ID': USER_POOL_ID, 'APP_CLIENT_ID': APP_CLIENT_ID,
+                 'CONNECT_RATE_LIMITS': json.dumps({'default': {'burst': 0, 'per_minute': 0}})}
+
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('utf-8')
+
+
+def int_to_b64(value):
+    return b64url(value.to_bytes((value.bit_length() + 7) // 8, 'big'))
+
+
+# Cognito publishes two signing keys per user pool, mirror that
+class LocalIssuer:
+    def __init__(self, bits):
+        self.keys = {}
+        for _ in range(2):
+            public_key, private_key = rsa.newkeys(bits)
+            self.keys[uuid.uuid4().hex] = (public_key, private_key)
+        # signs with a key that is not published in the JWKS
+        self.unpublished_kid = uuid.uuid4().hex
+        self.unpublished_key = rsa.newkeys(bits)[1]
+
+    def jwks(self):
+        return {'keys': [{'alg': 'RS256', 'e': int_to_b64(public_key.e), 'kid': kid, 'kty': 'RSA',
+                          'n': int_to_b64(public_key.n), 'use': 'sig'}
+                         for kid, (public_key, _) in self.keys.items()]}
+
+    def id_token(self, mix):
+        now = int(time.time())
+        kid = next(iter(self.keys))
+        private_key = self.keys[kid][1]
+        claims = {
+            'sub': str(uuid.uuid4()),
+            'email_verified': True,
+            'iss': f'https://cognito-idp.us-east-1.amazonaws.com/{USER_POOL_ID}',
+            'cognito:username': str(uuid.uuid4()),
+            'origin_jti': str(uuid.uuid4()),
+            'aud': APP_CLIENT_ID,
+            'event_id': str(uuid.uuid4()),
+            'token_use': 'id',
+            'auth_time': now,
+            'custom:role': '["BasicUser"]',
+            'exp': now + 3600,
+            'iat': now,
+            'jti': str(uuid.uuid4()),
+            'email': 'benchmark@example.com',
+        }
+        if mix == 'expired':
+            claims['exp'] = now - 60
+        elif mix == 'wrong_audience':
+            claims['aud'] = 'some-other-app-client'
+        elif mix == 'unknown_kid':
+            kid, private_key = self.unpublished_kid, self.unpublished_key
+        signing_input = f"{b64url(json.dumps({'kid': kid, 'alg': 'RS256'}).encode())}.{b64url(json.dumps(claims).encode())}"
+        return f'{signing_input}.{b64url(rsa.sign(signing_input.encode(), private_key, "SHA-256"))}'
+
+
+# In-process JWKS stand-in, counts how often the authorizer fetched it
+def start_jwks_stub(issuer):
+    body = json.dumps(issuer.jwks()).encode('utf-8')
+    fetches = {'count': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            fetches['count'] += 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/{USER_POOL_ID}/.well-known/jwks.json', fetches
+
+
+def event_for(token):
+    return {'queryStringParameters': {'Authorization': token}, 'methodArn': METHOD_ARN}
+
+
+def check_decision(mix, result):
+    allowed = result is not None and result['policyDocument']['Statement'][0]['Effect'] == 'Allow'
+    if allowed != (mix == 'valid'):
+        raise AssertionError(f'{mix} token was {"allowed" if allowed else "denied"}')
+
+
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    return ordered[len(ordered) // 2], ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+# Time import + first call in a fresh interpreter, the closest local equivalent of a Lambda cold start
+def cold_call_ms(jwks_url, token):
+    child = (
+        'import sys, time, json\n'
+        'start = time.perf_counter()\n'
+        'import lambda_function\n'
+        'result = lambda_function.lambda_handler(json.loads(sys.argv[1]), None)\n'
+        'allowed = result is not None and result["policyDocument"]["Statement"][0]["Effect"] == "Allow"\n'
+        'print(json.dumps({"ms": (time.perf_counter() - start) * 1000, "allowed": allowed}))\n'
+    )
+    env = {**os.environ, **BENCHMARK_ENV, 'JWKS_URL': jwks_url}
+    output = subprocess.run([sys.executable, '-c', child, json.dumps(event_for(token))], cwd=AUTHORIZER_DIR,
+                            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--cold-runs', type=int, default=5)
+    parser.add_argument('--bits', type=int, default=2048)
+    args = parser.parse_args()
+
+    issuer = LocalIssuer(args.bits)
+    server, jwks_url, fetches = start_jwks_stub(issuer)
+    os.environ.update({**BENCHMARK_ENV, 'JWKS_URL': jwks_url})
+    import lambda_function  # noqa: E402
+
+    print(f'{args.bits}-bit keys, {args.calls} calls per mix, {args.cold_runs} cold runs, JWKS stub at {jwks_url}')
+    print(f'{"mix":<16}{"cold p50 ms":>12}{"warm p50 ms":>12}{"warm p95 ms":>12}{"verify/s":>10}{"JWKS fetches":>14}')
+    for mix in MIXES:
+        tokens = [issuer.id_token(mix) for _ in range(args.calls)]
+
+        cold = []
+        for token in tokens[:args.cold_runs]:
+            sample = cold_call_ms(jwks_url, token)
+            if sample['allowed'] != (mix == 'valid'):
+                raise AssertionError(f'{mix} token got the wrong decision on a cold call')
+            cold.append(sample['ms'])
+
+        fetches_before = fetches['count']
+        warm = []
+        # the authorizer logs every call, keep that cost but not the output
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            # distinct tokens: every call decodes the token and checks the signature
+            start = time.perf_counter()
+            for token in tokens:
+                check_decision(mix, lambda_function.lambda_handler(event_for(token), None))
+            verify_rate = len(tokens) / (time.perf_counter() - start)
+
+            # the same token again: a valid one is served from the verified-token cache
+            for _ in range(args.calls):
+                start = time.perf_counter()
+                check_decision(mix, lambda_function.lambda_handler(event_for(tokens[0]), None))
+                warm.append((time.perf_counter() - start) * 1000)
+
+        warm_p50, warm_p95 = percentiles(warm)
+        print(f'{mix:<16}{statistics.median(cold):>12.2f}{warm_p50:>12.3f}{warm_p95:>12.3f}'
+              f'{verify_rate:>10.0f}{fetches["count"] - fetches_before:>14}')
+
+    print(f'token cache: {lambda_function.get_token_cache_stats()}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Cold-start import profile for the WebSocket authorizer.
+#
+# Imports lambda_function in fresh interpreters with `python -X importtime` and reports the
+# median total import time plus the most expensive modules it imports directly. Pass --compare-ref
+# to profile the authorizer bundle as it was at another git revision next to the working tree:
+#
+#   python test/benchmarks/authorizer_import_profile.py --compare-ref 258d698 [--runs 5]
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+AUTHORIZER_PATH = 'lib/authorization/websocket-api-authorizer'
+
+
+# Run one cold import and return the cumulative microseconds of lambda_function and of each of its direct imports
+def profile_once(bundle_dir):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import lambda_function'],
+        cwd=bundle_dir, capture_output=True, text=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1', 'USER_POOL_ID': 'profile', 'APP_CLIENT_ID': 'profile'},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        name = name.strip()
+        # -X importtime prints children before their parent, so collect depth-1 lines until a top-level line
+        if depth == 1:
+            children[name] = children.get(name, 0) + int(cumulative)
+        elif depth == 0:
+            if name == 'lambda_function':
+                return int(cumulative), children
+            children = {}
+    raise RuntimeError('lambda_function not found in -X importtime output')
+
+
+def profile(bundle_dir, runs):
+    samples = [profile_once(bundle_dir) for _ in range(runs)]
+    names = set().union(*(children for _, children in samples))
+    medians = {name: statistics.median(children.get(name, 0) for _, children in samples) for name in names}
+    return statistics.median(total for total, _ in samples), medians
+
+
+# Extract the authorizer bundle at a git ref into a temporary directory
+def export_ref(ref, target):
+    archive = subprocess.run(['git', 'archive', '--format=tar', ref, AUTHORIZER_PATH],
+                             cwd=REPO_ROOT, capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return os.path.join(target, AUTHORIZER_PATH)
+
+
+def report(label, total, medians, top):
+    print(f'{label}: {total / 1000:.1f} ms total import time')
+    for name, cumulative in sorted(medians.items(), key=lambda kv: -kv[1])[:top]:
+        print(f'    {name:<24} {cumulative / 1000:8.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--compare-ref', help='git revision to profile alongside the working tree')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f'median of {args.runs} cold imports, {sys.executable}')
+    if args.compare_ref:
+        with tempfile.TemporaryDirectory() as tmp:
+            before_total, before = profile(export_ref(args.compare_ref, tmp), args.runs)
+        report(f'before ({args.compare_ref})', before_total, before, args.top)
+    after_total, after = profile(os.path.join(REPO_ROOT, AUTHORIZER_PATH), args.runs)
+    report('working tree', after_total, after, args.top)
+    if args.compare_ref:
+        print(f'cold import saving: {(before_total - after_total) / 1000:.1f} ms ({before_total / max(after_total, 1):.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# Microbenchmark: RS256 verification in the WebSocket authorizer.
+#
+# Compares the previous per-request path (jwk.construct + verify on the pure-Python
+# rsa/pyasn1 backend that ships with the Lambda) against keys built once per kid: jose's
+# RSAKey and the RS256PublicKey used by lambda_function.py, which wraps the same rsa backend.
+# Verification costs the same once the key is cached; RS256PublicKey only saves importing jose
+# at cold start (see authorizer_import_profile.py). Keys and signatures are generated locally.
+#
+#   python test/benchmarks/authorizer_rs256_benchmark.py [--iterations 2000] [--bits 2048]
+import argparse
+import base64
+import json
+import os
+import sys
+import timeit
+
+AUTHORIZER_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'lib', 'authorization', 'websocket-api-authorizer')
+sys.path.insert(0, os.path.abspath(AUTHORIZER_DIR))
+
+import rsa  # noqa: E402  (vendored in the authorizer bundle)
+from jose.backends.rsa_backend import RSAKey  # noqa: E402
+from rs256 import RS256PublicKey  # noqa: E402
+
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('utf-8')
+
+
+def int_to_b64(value):
+    return b64url(value.to_bytes((value.bit_length() + 7) // 8, 'big'))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--bits', type=int, default=2048)
+    args = parser.parse_args()
+
+    public_key, private_key = rsa.newkeys(args.bits)
+    jwk_dict = {'kid': 'bench', 'alg': 'RS256', 'kty': 'RSA', 'use': 'sig',
+                'n': int_to_b64(public_key.n), 'e': int_to_b64(public_key.e)}
+    header = b64url(json.dumps({'kid': 'bench', 'alg': 'RS256'}).encode('utf-8'))
+    claims = b64url(json.dumps({'sub': 'bench-user', 'aud': 'bench-client', 'exp': 2 ** 31}).encode('utf-8'))
+    message = f'{header}.{claims}'.encode('utf-8')
+    signature = rsa.sign(message, private_key, 'SHA-256')
+
+    jose_key = RSAKey(jwk_dict, 'RS256')
+    fast_key = RS256PublicKey.from_jwk(jwk_dict)
+    assert jose_key.verify(message, signature) and fast_key.verify(message, signature)
+
+    cases = [
+        ('jose construct + verify (per request, before)', lambda: RSAKey(jwk_dict, 'RS256').verify(message, signature)),
+        ('jose verify (key constructed once)', lambda: jose_key.verify(message, signature)),
+        ('RS256PublicKey.verify (key constructed once)', lambda: fast_key.verify(message, signature)),
+    ]
+    print(f'{args.bits}-bit key, {args.iterations} iterations')
+    baseline = None
+    for name, fn in cases:
+        seconds = min(timeit.repeat(fn, number=args.iterations, repeat=3))
+        per_call_us = seconds / args.iterations * 1e6
+        baseline = baseline or per_call_us
+        print(f'{name:<50} {per_call_us:10.1f} us/verify  {baseline / per_call_us:6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# Storage benchmark for chat history in the session handler (lib/chatbot-api/functions/session-handler).
+#
+# Compares a chat entry stored as a DynamoDB map with the zlib-packed binary entry written when
+# SESSION_HISTORY_COMPRESSION=zlib. For transcripts of several lengths it reports the size of one
+# message item, the write capacity of an append, the read capacity of loading the whole session
+# (eventually consistent Query, as get_session does) and the encode/decode time per entry.
+# Item sizes follow DynamoDB's documented sizing rules, nothing is sent to AWS.
+#
+# Transcripts are synthetic by default: questions and multi-paragraph answers built from policy-style
+# vocabulary, with the JSON-string source metadata the chat Lambda stores. Pass --transcript with the
+# JSON body of a get_session response to measure a real session instead.
+#
+#   python test/benchmarks/session_history_codec_benchmark.py [--turns 10 50 200] [--transcript session.json]
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import timeit
+import uuid
+
+SESSION_HANDLER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'lib', 'chatbot-api', 'functions', 'session-handler'))
+sys.path.insert(0, SESSION_HANDLER_DIR)
+
+from history_codec import decode_entry, encode_entry  # noqa: E402
+
+VOCABULARY = (
+    'the a of to and in for is on that by this with be are as or at from policy agency state employees must '
+    'procurement contract vendor security information technology data access request approval department '
+    'secretariat commonwealth executive office services guidance standard requirement compliance review '
+    'system user account network incident report risk management record retention public disclosure '
+    'within days business annual training program application submit form manager director responsible '
+    'federal regulation chapter section pursuant accordance applicable exception waiver documentation'
+).split()
+
+
+def sentence(rng, words):
+    text = ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def paragraph(rng, sentences):
+    return ' '.join(sentence(rng, rng.randint(8, 24)) for _ in range(sentences))
+
+
+# One turn shaped like the entries the chat Lambda appends: user prompt, answer and a JSON string of sources
+def synthetic_entry(rng):
+    sources = [{
+        'title': f'{sentence(rng, rng.randint(3, 7))[:-1]}.pdf',
+        'uri': f's3://eotss-knowledge-base/{uuid.UUID(int=rng.getrandbits(128))}/{"-".join(rng.choice(VOCABULARY) for _ in range(4))}.pdf',
+        'excerpt': paragraph(rng, 2),
+    } for _ in range(rng.randint(2, 5))]
+    return {
+        'user': sentence(rng, rng.randint(10, 40)),
+        'chatbot': '\n\n'.join(paragraph(rng, rng.randint(2, 5)) for _ in range(rng.randint(2, 5))),
+        'metadata': json.dumps(sources),
+    }
+
+
+# DynamoDB item size: attribute names plus values, with 3 bytes per map/list and 1 byte per element
+def value_size(value):
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, (int, float)):
+        return len(str(abs(value)).replace('.', '')) // 2 + 2
+    if isinstance(value, dict):
+        return 3 + sum(len(key.encode('utf-8')) + value_size(item) + 1 for key, item in value.items())
+    if isinstance(value, list):
+        return 3 + sum(value_size(item) + 1 for item in value)
+    raise TypeError(type(value))
+
+
+def item_size(item):
+    return sum(len(name.encode('utf-8')) + value_size(value) for name, value in item.items())
+
+
+def message_item(index, entry):
+    return {'user_id': str(uuid.UUID(int=0)), 'session_id': f'{uuid.UUID(int=1)}#{index:06d}', 'message_index': index, 'entry': entry}
+
+
+def capacity(sizes):
+    # an append writes one message item; a session read is one eventually consistent Query over all of them
+    write_units = sum(math.ceil(size / 1024) for size in sizes) / len(sizes)
+    read_units = math.ceil(sum(sizes) / 4096) * 0.5
+    return write_units, read_units
+
+
+def per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def report(label, entries):
+    plain = [item_size(message_item(i, entry)) for i, entry in enumerate(entries)]
+    packed_entries = [encode_entry(entry) for entry in entries]
+    packed = [item_size(message_item(i, entry)) for i, entry in enumerate(packed_entries)]
+    assert all(decode_entry(packed_entry) == entry for packed_entry, entry in zip(packed_entries, entries))
+    plain_wcu, plain_rcu = capacity(plain)
+    packed_wcu, packed_rcu = capacity(packed)
+    number = max(1, 2000 // len(entries))
+    encode_us = per_call_us(lambda: [encode_entry(entry) for entry in entries], number) / len(entries)
+    decode_us = per_call_us(lambda: [decode_entry(entry) for entry in packed_entries], number) / len(entries)
+    print(f'{label:<12}{sum(plain) / len(plain):>10.0f}{sum(packed) / len(packed):>10.0f}{sum(plain) / sum(packed):>7.2f}x'
+          f'{plain_wcu:>9.2f}{packed_wcu:>9.2f}{plain_rcu:>9.1f}{packed_rcu:>9.1f}{encode_us:>10.1f}{decode_us:>10.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--turns', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--transcript', help='JSON body of a get_session response')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f'{"session":<12}{"item B":>10}{"zlib B":>10}{"ratio":>8}{"WCU":>9}{"zlib WCU":>9}'
+          f'{"RCU":>9}{"zlib RCU":>9}{"enc us":>10}{"dec us":>10}')
+    if args.transcript:
+        with open(args.transcript) as f:
+            entries = json.load(f)['chat_history']
+        report(f'{len(entries)} turns', entries)
+        return
+    rng = random.Random(args.seed)
+    for turns in args.turns:
+        report(f'{turns} turns', [synthetic_entry(rng) for _ in range(turns)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# The WebSocket authorizer when the JWKS cannot be refreshed: tokens signed with a cached key are still
+# verified, only unknown kids are denied, and a failed fetch is not retried on every request.
+#
+#   python -m pytest test/test_authorizer_jwks_refresh.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+
+import authorizer_benchmark as bench  # noqa: E402  (also puts the authorizer directory on sys.path)
+
+
+@pytest.fixture(scope='module')
+def issuer():
+    return bench.LocalIssuer(1024)
+
+
+@pytest.fixture(scope='module')
+def authorizer(issuer):
+    server, jwks_url, _ = bench.start_jwks_stub(issuer)
+    os.environ.update({**bench.BENCHMARK_ENV, 'JWKS_URL': jwks_url})
+    import lambda_function
+    # keys cached by another test module belong to another issuer
+    lambda_function.jwks_cache.update({'keys': {}, 'fetched_at': 0.0, 'retry_at': 0.0})
+    yield lambda_function
+    server.shutdown()
+
+
+# Starts from a cache filled by a successful fetch, then makes every later fetch fail
+@pytest.fixture
+def failing_fetch(authorizer, issuer, monkeypatch):
+    authorizer.token_cache.clear()
+    authorizer.jwks_cache.update({'keys': {}, 'fetched_at': 0.0, 'retry_at': 0.0})
+    assert effect(authorize(authorizer, issuer.id_token('valid'))) == 'Allow'
+    attempts = []
+
+    def fetch_jwks():
+        attempts.append(authorizer.time.time())
+        raise OSError('Cognito unreachable')
+
+    monkeypatch.setattr(authorizer, 'fetch_jwks', fetch_jwks)
+    return attempts
+
+
+def authorize(authorizer, token):
+    return authorizer.lambda_handler({'queryStringParameters': {'Authorization': token}, 'methodArn': bench.METHOD_ARN}, None)
+
+
+def effect(result):
+    return result['policyDocument']['Statement'][0]['Effect']
+
+
+def test_cached_key_is_used_when_the_refresh_after_expiry_fails(authorizer, issuer, failing_fetch, monkeypatch):
+    later = authorizer.time.time() + authorizer.JWKS_CACHE_TTL_SECONDS + 1
+    monkeypatch.setattr(authorizer.time, 'time', lambda: later)
+    # distinct tokens, so none of them is served from the token cache
+    assert effect(authorize(authorizer, issuer.id_token('valid'))) == 'Allow'
+    assert effect(authorize(authorizer, issuer.id_token('valid'))) == 'Allow'
+    # the failed fetch is not retried by the second request
+    assert len(failing_fetch) == 1
+
+
+def test_unknown_kid_is_denied_when_the_refresh_fails(authorizer, issuer, failing_fetch, monkeypatch):
+    later = authorizer.time.time() + authorizer.JWKS_MIN_REFRESH_SECONDS + 1
+    monkeypatch.setattr(authorizer.time, 'time', lambda: later)
+    assert effect(authorize(authorizer, issuer.id_token('unknown_kid'))) == 'Deny'
+    assert effect(authorize(authorizer, issuer.id_token('unknown_kid'))) == 'Deny'
+    assert len(failing_fetch) == 1
+    # and retried once the backoff is over
+    retry = later + authorizer.JWKS_RETRY_SECONDS + 1
+    monkeypatch.setattr(authorizer.time, 'time', lambda: retry)
+    assert effect(authorize(authorizer, issuer.id_token('unknown_kid'))) == 'Deny'
+    assert len(failing_fetch) == 2
+
+
+def test_cold_cache_denies_when_the_jwks_cannot_be_fetched(authorizer, issuer, failing_fetch):
+    authorizer.token_cache.clear()
+    authorizer.jwks_cache.update({'keys': {}, 'fetched_at': 0.0, 'retry_at': 0.0})
+    assert effect(authorize(authorizer, issuer.id_token('valid'))) == 'Deny'
@@ -0,0 +1,107 @@
+# The WebSocket authorizer with POLICY_RESOURCE_SCOPE=stage: one Allow covers every route of the stage,
+# but expired, wrong-audience and badly signed tokens are still denied, also when the token cache is warm.
+# Tokens come from the local issuer and JWKS stub of the authorizer benchmark.
+#
+#   python -m pytest test/test_authorizer_stage_scope.py
+import base64
+import json
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+
+import authorizer_benchmark as bench  # noqa: E402  (also puts the authorizer directory on sys.path)
+
+STAGE_RESOURCE = bench.METHOD_ARN.rsplit('/', 1)[0] + '/*'
+OTHER_ROUTE_ARN = bench.METHOD_ARN.rsplit('/', 1)[0] + '/getChatbotResponse'
+
+
+@pytest.fixture(scope='module')
+def issuer():
+    return bench.LocalIssuer(1024)
+
+
+@pytest.fixture(scope='module')
+def authorizer(issuer):
+    server, jwks_url, _ = bench.start_jwks_stub(issuer)
+    os.environ.update({**bench.BENCHMARK_ENV, 'JWKS_URL': jwks_url})
+    import lambda_function
+    # keys cached by another test module belong to another issuer
+    lambda_function.jwks_cache.update({'keys': {}, 'fetched_at': 0.0, 'retry_at': 0.0})
+    yield lambda_function
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def stage_scope(authorizer, monkeypatch):
+    monkeypatch.setattr(authorizer, 'POLICY_RESOURCE_SCOPE', 'stage')
+    authorizer.token_cache.clear()
+
+
+def authorize(authorizer, token, method_arn=bench.METHOD_ARN):
+    return authorizer.lambda_handler({'queryStringParameters': {'Authorization': token}, 'methodArn': method_arn}, None)
+
+
+def effect(result):
+    return result['policyDocument']['Statement'][0]['Effect']
+
+
+# A token signed with the issuer's published key, with some claims replaced
+def signed_token(issuer, **claims):
+    header, payload, _ = issuer.id_token('valid').split('.')
+    payload = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+    payload.update(claims)
+    signing_input = f"{header}.{bench.b64url(json.dumps(payload).encode())}"
+    private_key = next(iter(issuer.keys.values()))[1]
+    return f"{signing_input}.{bench.b64url(bench.rsa.sign(signing_input.encode(), private_key, 'SHA-256'))}"
+
+
+def test_valid_token_is_allowed_for_the_whole_stage(authorizer, issuer):
+    token = issuer.id_token('valid')
+    result = authorize(authorizer, token)
+    assert effect(result) == 'Allow'
+    assert result['policyDocument']['Statement'][0]['Resource'] == STAGE_RESOURCE
+    # served from the token cache for another route, with the same stage-wide policy
+    assert authorize(authorizer, token, OTHER_ROUTE_ARN) == result
+    assert authorizer.get_token_cache_stats()['hits'] >= 1
+
+
+@pytest.mark.parametrize('mix', ['expired', 'wrong_audience', 'unknown_kid'])
+def test_invalid_token_is_denied(authorizer, issuer, mix):
+    token = issuer.id_token(mix)
+    assert effect(authorize(authorizer, token)) == 'Deny'
+    # a rejected token is never cached, asking again is denied again
+    assert effect(authorize(authorizer, token)) == 'Deny'
+
+
+def test_bad_signature_is_denied_when_the_original_token_is_cached(authorizer, issuer):
+    token = issuer.id_token('valid')
+    assert effect(authorize(authorizer, token)) == 'Allow'
+    # the cached token's header and claims with the signature of another token
+    header, payload, _ = token.split('.')
+    forged = f"{header}.{payload}.{issuer.id_token('wrong_audience').rsplit('.', 1)[1]}"
+    assert effect(authorize(authorizer, forged)) == 'Deny'
+    # the cached token's signature on modified claims
+    tampered = signed_token(issuer, aud='some-other-app-client').split('.')
+    assert effect(authorize(authorizer, f"{tampered[0]}.{tampered[1]}.{token.rsplit('.', 1)[1]}")) == 'Deny'
+
+
+def test_wrong_audience_is_denied_when_a_valid_token_of_the_same_user_is_cached(authorizer, issuer):
+    token = signed_token(issuer, sub='user-1')
+    assert effect(authorize(authorizer, token)) == 'Allow'
+    assert effect(authorize(authorizer, signed_token(issuer, sub='user-1', aud='some-other-app-client'))) == 'Deny'
+
+
+def test_cached_token_is_denied_once_expired(authorizer, issuer, monkeypatch):
+    token = signed_token(issuer, exp=int(time.time()) + 60)
+    assert effect(authorize(authorizer, token)) == 'Allow'
+    assert effect(authorize(authorizer, token)) == 'Allow'
+    hits = authorizer.get_token_cache_stats()['hits']
+    later = time.time() + 120
+    monkeypatch.setattr(authorizer.time, 'time', lambda: later)
+    assert effect(authorize(authorizer, token)) == 'Deny'
+    # the expired entry was dropped instead of being served
+    assert authorizer.get_token_cache_stats()['hits'] == hits